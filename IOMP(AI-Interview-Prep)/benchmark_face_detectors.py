@@ -0,0 +1,151 @@
+"""
+Offline accuracy/latency benchmark of the face detector backends in
+components/interview.py.
+
+    python benchmark_face_detectors.py --corpus fixtures/faces
+    python benchmark_face_detectors.py --detectors haar,lbp --repeat 5
+
+The corpus is a directory with one subdirectory per face count (0/, 1/, 2/,
+...) holding JPEG/PNG frames. Multi-face frames are also composited from the
+single-face ones by placing their centres side by side, since real ones are
+rare. Each frame goes through the production pipeline (reduced grayscale
+decode plus detection) on one OpenCV thread, so throughput is per core.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from components.interview import FACE_DETECTORS, decode_gray
+from components.proctoring import classify
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CLASSES = ["none", "one", "many"]
+FRAME_SIZE = (640, 480)
+
+
+def load_corpus(root):
+    """Returns [(label, name, encoded bytes)] from root/<face count>/*."""
+    frames = []
+    for entry in sorted(os.listdir(root)):
+        folder = os.path.join(root, entry)
+        if not (entry.isdigit() and os.path.isdir(folder)):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(folder, name), "rb") as f:
+                    frames.append((int(entry), f"{entry}/{name}", f.read()))
+    return frames
+
+
+def composite(images, count, rng):
+    """
+    Places the central vertical strips of `count` single-face frames side by
+    side. Webcam faces are roughly centred, so each strip keeps its face at
+    the original scale.
+    """
+    width, _ = FRAME_SIZE
+    strip = width // count
+    strips = []
+    for image in rng.sample(images, count):
+        left = (width - strip) // 2 + rng.randrange(-strip // 8, strip // 8 + 1)
+        strips.append(image[:, left:left + strip])
+    canvas = cv2.resize(np.hstack(strips), FRAME_SIZE)
+    return cv2.imencode(".jpg", canvas, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def synthesize_multi_face(frames, per_count, seed=0):
+    rng = random.Random(seed)
+    singles = [cv2.resize(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), FRAME_SIZE)
+               for label, _, data in frames if label == 1]
+    if len(singles) < 3:
+        return []
+    return [(count, f"synthetic/{count}_{i}", composite(singles, count, rng))
+            for count in (2, 3) for i in range(per_count)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_detector(detector, frames, repeat):
+    confusion = {(actual, predicted): 0 for actual in CLASSES for predicted in CLASSES}
+    latencies = []
+    cpu = 0.0
+    misclassified = []
+    for i in range(repeat):
+        for label, name, data in frames:
+            cpu_start, start = time.thread_time(), time.perf_counter()
+            gray = decode_gray(data)
+            faces = detector.detect(gray) if gray is not None else []
+            latencies.append((time.perf_counter() - start) * 1000)
+            cpu += time.thread_time() - cpu_start
+            if i == 0:
+                actual, predicted = classify(label), classify(None if faces is None else len(faces))
+                confusion[(actual, predicted)] = confusion.get((actual, predicted), 0) + 1
+                if actual != predicted:
+                    misclassified.append(f"{name}: expected {label}, got {None if faces is None else len(faces)}")
+    return {
+        "latencies": latencies,
+        "frames_per_core_second": len(latencies) / cpu if cpu else float("inf"),
+        "confusion": confusion,
+        "misclassified": misclassified,
+    }
+
+
+def print_confusion(confusion):
+    print(f"    {'actual / predicted':<20}" + "".join(f"{c:>8}" for c in CLASSES + ["unknown"]))
+    for actual in CLASSES:
+        row = [confusion.get((actual, predicted), 0) for predicted in CLASSES + ["unknown"]]
+        print(f"    {actual:<20}" + "".join(f"{n:>8}" for n in row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join("fixtures", "faces"))
+    parser.add_argument("--detectors", default=",".join(FACE_DETECTORS))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the corpus")
+    parser.add_argument("--synthetic", type=int, default=10, help="Composited frames per face count (2 and 3)")
+    parser.add_argument("--show-errors", action="store_true", help="List misclassified frames")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus):
+        parser.error(f"corpus directory {args.corpus} not found (expected {args.corpus}/0, {args.corpus}/1, ...)")
+    frames = load_corpus(args.corpus)
+    frames += synthesize_multi_face(frames, args.synthetic)
+    if not frames:
+        parser.error(f"no images found under {args.corpus}")
+    cv2.setNumThreads(1)
+
+    counts = {c: sum(classify(label) == c for label, _, _ in frames) for c in CLASSES}
+    print(f"{len(frames)} frames ({', '.join(f'{n} {c}' for c, n in counts.items())}), {args.repeat} timed passes")
+    print(f"{'detector':<14}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'fps/core':>10}{'accuracy':>10}")
+    reports = {}
+    for name in [d.strip() for d in args.detectors.split(",") if d.strip()]:
+        detector = FACE_DETECTORS.get(name)
+        if detector is None or not detector.available():
+            print(f"{name:<14}unavailable (unknown backend or missing cascade file)")
+            continue
+        report = run_detector(detector, frames, args.repeat)
+        reports[name] = report
+        correct = sum(report["confusion"].get((c, c), 0) for c in CLASSES)
+        lat = report["latencies"]
+        print(f"{name:<14}{percentile(lat, 50):>9.2f}{percentile(lat, 95):>9.2f}{percentile(lat, 99):>9.2f}"
+              f"{statistics.mean(lat):>9.2f}{report['frames_per_core_second']:>10.1f}{correct / len(frames):>10.1%}")
+
+    for name, report in reports.items():
+        print(f"\n{name}")
+        print_confusion(report["confusion"])
+        if args.show_errors:
+            for line in report["misclassified"]:
+                print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Offline benchmark of the LLM-backed flows (question generation, feedback
+report, coach chat) against the local stub in utils/llm_stub_server.py.
+
+    python benchmark_llm.py --profile instant --iterations 50
+    python benchmark_llm.py --mode replay --fixtures fixtures/llm --profile groq
+
+With the "instant" profile the numbers are our own client overhead.
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Benchmarks must not be throttled by the production request budget
+os.environ.setdefault("GROQ_RPM", "1000000")
+os.environ.setdefault("GROQ_TPM", "1000000000")
+
+import utils.llm_cache as llm_cache
+from utils.llm_metrics import get_metrics
+from utils.llm_stub_server import LATENCY_PROFILES, StubBackend, start_stub_server
+
+TRANSCRIPT = [
+    {"question": "Given an array of integers, return the indices of two numbers that add up to a target.",
+     "answer": "def two_sum(nums, target):\n    seen = {}\n    for i, n in enumerate(nums):\n        if target - n in seen:\n            return [seen[target - n], i]\n        seen[n] = i\n"},
+    {"question": "Reverse a singly linked list.",
+     "answer": "def reverse(head):\n    prev = None\n    while head:\n        head.next, prev, head = prev, head, head.next\n    return prev\n"},
+]
+
+
+def run_question():
+    from utils.question_prefetch import generate_question
+    generate_question(("Software Engineer", "Technical Round", "DSA (LeetCode Style)", "Medium"))
+    return None
+
+
+def run_feedback():
+    from components.feedback import generate_feedback
+    stream = generate_feedback({"transcript": TRANSCRIPT, "round": "Technical Round"}, stream=True)
+    for _ in stream:
+        pass
+    return stream.ttft
+
+
+def run_chat():
+    from utils.chat_context import ChatContext
+    from utils.grok_api import stream_grok_api
+    messages = [
+        {"role": "system", "content": "You are an AI Interview Coach."},
+        {"role": "assistant", "content": "Hello! How can I help you improve today?"},
+        {"role": "user", "content": "How should I approach dynamic programming questions?"},
+    ]
+    stream = stream_grok_api(ChatContext().build_request(messages), cache=False, call_site="chat")
+    for _ in stream:
+        pass
+    return stream.ttft
+
+
+FLOWS = {"question": run_question, "feedback": run_feedback, "chat": run_chat}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(flow):
+    start = time.perf_counter()
+    ttft = FLOWS[flow]()
+    return time.perf_counter() - start, ttft
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", default="question,feedback,chat")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel simulated sessions")
+    parser.add_argument("--mode", choices=["synthetic", "replay"], default="synthetic")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="instant")
+    parser.add_argument("--fixtures", default=os.path.join("fixtures", "llm"))
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--use-cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--metrics", choices=["prometheus", "json"], help="Dump the collected LLM telemetry at the end")
+    args = parser.parse_args()
+
+    backend = StubBackend(mode=args.mode, profile=args.profile, fixture_dir=args.fixtures,
+                          completion_tokens=args.completion_tokens)
+    server = start_stub_server(backend)
+    os.environ["GROQ_API_URL"] = server.url
+    if not args.use_cache:
+        # Memory-only cache that never retains anything
+        llm_cache._cache = llm_cache.LLMCache(path=None, max_entries=0)
+
+    print(f"Stub at {server.url} (mode={args.mode}, profile={args.profile})")
+    print(f"{'flow':<10}{'n':>5}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'ttft p50 ms':>13}")
+    for flow in [f.strip() for f in args.flows.split(",") if f.strip()]:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda _: timed(flow), range(args.iterations)))
+        latencies = [r[0] * 1000 for r in results]
+        ttfts = [r[1] * 1000 for r in results if r[1] is not None]
+        ttft_text = f"{percentile(ttfts, 50):.1f}" if ttfts else "-"
+        print(f"{flow:<10}{len(latencies):>5}{statistics.mean(latencies):>10.1f}"
+              f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}{ttft_text:>13}")
+    server.shutdown()
+
+    if args.metrics == "prometheus":
+        print(get_metrics().export_prometheus())
+    elif args.metrics == "json":
+        print(get_metrics().snapshot_json())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.grok_api import call_grok_api
+from utils.grok_api import stream_grok_api, GroqAPIError
+from utils.chat_context import ChatContext
 
 def render_chatbot():
     st.header("Chat with your AI Interview Coach 💬")
@@ -22,6 +23,7 @@ def render_chatbot():
             {"role": "system", "content": system_context},
             {"role": "assistant", "content": "Hello! I'm your AI Coach. How can I help you improve today? Feel free to ask me to clarify any feedback or if you'd like another practice question."}
         ]
+        st.session_state.chat_context = ChatContext()
 
     for message in st.session_state.messages:
         if message["role"] != "system":
@@ -32,10 +34,23 @@ def render_chatbot():
         st.chat_message("user").markdown(prompt)
         st.session_state.messages.append({"role": "user", "content": prompt})
 
+        # Only the system prompt, a running summary and the latest turns are sent
+        if "chat_context" not in st.session_state:
+            st.session_state.chat_context = ChatContext()
+        request_messages = st.session_state.chat_context.build_request(st.session_state.messages)
+
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                response = call_grok_api(st.session_state.messages)
-            st.markdown(response)
+            try:
+                # Render tokens as they arrive. The opening question after the
+                # greeting is often repeated verbatim, so that one is cached.
+                is_opener = len(st.session_state.messages) <= 3
+                response = st.write_stream(stream_grok_api(request_messages, cache=is_opener, call_site="chat"))
+            except GroqAPIError as e:
+                st.error(f"🚨 The AI Coach could not answer: {e}")
+                # Drop the unanswered prompt so the history stays user/assistant alternating
+                st.session_state.messages.pop()
+                return
+            st.caption(f"Context sent: ~{st.session_state.chat_context.last_token_count} tokens")
             
         # Add assistant response to chat history
         st.session_state.messages.append({"role": "assistant", "content": response})
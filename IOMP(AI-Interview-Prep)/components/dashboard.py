@@ -1,6 +1,7 @@
 import streamlit as st
 
 from utils.supabase_client import get_supabase
+from utils.question_prefetch import get_prefetcher, question_key
 
 def render_dashboard():
     st.markdown("<h1 style='text-align: center; margin-bottom: 2rem;'>Dashboard 🏠</h1>", unsafe_allow_html=True)
@@ -52,11 +53,14 @@ def render_dashboard():
                 st.session_state.interview_timer_limit = selected_timer_seconds
                 st.session_state.current_page = 'verification'
                 
+                # Start generating questions while the candidate goes through verification
+                get_prefetcher().warm(question_key(selected_role, selected_round, selected_category, difficulty))
+                
                 # Wipe all previous interview-related state for a clean start
                 keys_to_clear = [
                     'start_time', 'time_limit', 'current_question', 'current_hr_question', 
-                    'code_answer', 'answer_text', 'interview_transcript', 'interview_data', 
-                    'feedback_report', 'code_output', 'esc_count', 'last_q_added', 'messages',
+                    'code_answer', 'answer_text', 'hr_answer_text', 'hr_seeded_audio', 'transcriptions', 'interview_transcript', 'answer_evaluations', 'interview_data', 
+                    'feedback_report', 'feedback_timing', 'code_output', 'test_cases_future', 'test_report', 'complexity_report', 'code_language', 'proctor_sessions', 'esc_count', 'last_q_added', 'messages', 'chat_context',
                     'permissions_confirmed', 'mic_granted'
                 ]
                 for k in keys_to_clear:
@@ -104,11 +108,14 @@ def render_dashboard():
                     st.session_state.interview_timer_limit = selected_timer_seconds
                     st.session_state.current_page = 'verification'
                     
+                    # Start generating questions while the candidate goes through verification
+                    get_prefetcher().warm(question_key(selected_role, selected_round, selected_category, difficulty))
+                    
                     # Wipe all previous interview-related state for a clean start
                     keys_to_clear = [
                         'start_time', 'time_limit', 'current_question', 'current_hr_question', 
-                        'code_answer', 'answer_text', 'interview_transcript', 'interview_data', 
-                        'feedback_report', 'code_output', 'esc_count', 'last_q_added', 'messages',
+                        'code_answer', 'answer_text', 'hr_answer_text', 'hr_seeded_audio', 'transcriptions', 'interview_transcript', 'answer_evaluations', 'interview_data', 
+                        'feedback_report', 'feedback_timing', 'code_output', 'test_cases_future', 'test_report', 'complexity_report', 'code_language', 'proctor_sessions', 'esc_count', 'last_q_added', 'messages', 'chat_context',
                         'permissions_confirmed', 'mic_granted'
                     ]
                     for k in keys_to_clear:
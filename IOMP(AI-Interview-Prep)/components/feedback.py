@@ -1,20 +1,160 @@
+import time
 import streamlit as st
-from utils.grok_api import call_grok_api
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils.grok_api import call_grok_api, stream_grok_api, GroqAPIError
 
-def generate_feedback(interview_data):
+# Answers are graded in the background while the interview is still running
+_evaluation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="answer-eval")
+# Coding answers are first run against their tests and profiled; these jobs
+# mostly wait on the execution scheduler, so they get their own threads
+_measurement_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="answer-measure")
+EVALUATION_WAIT_SECONDS = 90
+
+def evaluate_answer(round_type, entry):
+    """
+    Grades a single question/answer pair into a compact evaluation that the
+    final report is built from.
+    """
+    prompt = f"""
+    You are grading one answer from a {round_type} interview.
+
+    ### Question
+    {entry['question']}
+
+    ### Candidate Answer
+    {entry['answer']}
+    {_test_results_section(entry)}{_complexity_section(entry)}{_not_measured_section(entry)}
+    Reply in at most 120 words using exactly this format:
+    Score: <0-10>
+    Ideal approach: <1-2 sentences>
+    Strengths: <short list>
+    Gaps: <short list>
+    """
+    return call_grok_api([{"role": "system", "content": "You are a helpful and strict expert technical interviewer."}, {"role": "user", "content": prompt}], temperature=0.3, priority="background", call_site="answer_eval")
+
+def _test_results_section(entry):
+    if not entry.get('test_results'):
+        return ""
+    return f"""
+    ### Measured Test Results
+    The code was actually run against generated test cases. Base the correctness part
+    of the score on these facts rather than on reading the code:
+    {entry['test_results']}
+    """
+
+def _complexity_section(entry):
+    if not entry.get('complexity'):
+        return ""
+    return f"""
+    ### Measured Time Complexity
+    The solution was profiled on inputs of growing size. Judge its efficiency from this
+    measurement rather than guessing from the code:
+    {entry['complexity']}
+    """
+
+def _not_measured_section(entry):
+    if not entry.get('not_measured'):
+        return ""
+    return f"""
+    ### Not Measured
+    Some measurements could not be taken, so judge these parts by reading the code:
+    {entry['not_measured']}
+    """
+
+def _measure_and_evaluate(round_type, entry, measure):
+    """Adds the measured test results/complexity to the entry, then grades it."""
+    if measure is not None:
+        try:
+            entry.update({k: v for k, v in measure().items() if v})
+        except Exception as e:
+            print(f"Measuring the answer failed: {e}")
+            entry["not_measured"] = f"Measuring the answer failed: {e}"
+    entry["evaluation"] = evaluate_answer(round_type, entry)
+    return entry
+
+def submit_evaluation(round_type, entry, measure=None):
+    """
+    Grades an answer in the background. `measure()` (optional) runs there
+    first and returns {"test_results", "complexity", "not_measured"} for the
+    grader. The future's result is the graded copy of the entry;
+    `future.entry` is that same copy, which carries the measurements as soon
+    as they are known.
+    """
+    # Pass a copy: the background thread must not touch Streamlit session state
+    working = dict(entry)
+    executor = _measurement_executor if measure is not None else _evaluation_executor
+    future = executor.submit(_measure_and_evaluate, round_type, working, measure)
+    future.entry = working
+    return future
+
+def _collect_evaluations(interview_data, transcript):
+    """
+    Waits up to EVALUATION_WAIT_SECONDS in total for the background
+    evaluations of every answer and returns the graded entries. Answers that
+    were never submitted, or whose evaluation failed, are graded again within
+    the same deadline. Answers still being graded at the deadline are reported
+    as not graded instead of being sent to the LLM a second time.
+    """
+    deadline = time.monotonic() + EVALUATION_WAIT_SECONDS
+    round_type = interview_data['round']
+    futures = list(interview_data.get('evaluations') or [])[:len(transcript)]
+    for entry in transcript[len(futures):]:
+        futures.append(submit_evaluation(round_type, entry))
+
+    # One deadline for the whole report; a failed evaluation is retried once
+    # while time is left
+    pending, retried = set(futures), set()
+    while pending:
+        done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            i = futures.index(future)
+            if future.exception() is not None and i not in retried:
+                print(f"Background evaluation of question {i+1} failed: {future.exception()}")
+                retried.add(i)
+                # The failed copy already holds the measurements, so only grading is repeated
+                futures[i] = submit_evaluation(round_type, future.entry)
+                pending.add(futures[i])
+
+    graded = []
+    for i, future in enumerate(futures):
+        if future.done() and future.exception() is None:
+            graded.append(future.result())
+            continue
+        if future.done():
+            reason = f"the evaluation failed ({future.exception()})"
+        else:
+            reason = "the evaluation did not finish in time"
+            future.cancel()
+        print(f"Question {i+1} not graded: {reason}")
+        graded.append(dict(future.entry, evaluation=f"Not graded: {reason}."))
+    return graded
+
+def generate_feedback(interview_data, stream=False):
     transcript = interview_data.get('transcript', [])
     if not transcript:
         # Fallback for old single-question data
         transcript = [{"question": interview_data.get('question', 'N/A'), "answer": interview_data.get('answer', 'N/A')}]
     
+    # The report is synthesised from compact per-question evaluations, so its
+    # prompt stays small no matter how many (or how long) the answers were.
+    graded = _collect_evaluations(interview_data, transcript)
     transcript_text = ""
-    for i, entry in enumerate(transcript):
-        transcript_text += f"\n### Question {i+1}\n{entry['question']}\n\n### Answer {i+1}\n{entry['answer']}\n\n"
+    for i, entry in enumerate(graded):
+        transcript_text += f"\n### Question {i+1}\n{entry['question']}\n\n### Evaluation {i+1}\n{entry['evaluation']}\n\n"
+        if entry.get('test_results'):
+            transcript_text += f"### Measured Test Results {i+1}\n{entry['test_results']}\n\n"
+        if entry.get('complexity'):
+            transcript_text += f"### Measured Time Complexity {i+1}\n{entry['complexity']}\n\n"
+        if entry.get('not_measured'):
+            transcript_text += f"### Not Measured {i+1}\n{entry['not_measured']}\n\n"
 
     prompt = f"""
     You are an expert AI Interview Coach. The user just completed a {interview_data['round']} interview session with {len(transcript)} question(s).
     
-    Here is the full transcript of the interview:
+    Here are the questions together with a per-answer evaluation:
     {transcript_text}
     
     Evaluate the candidate's overall performance across all questions and provide a comprehensive review formatted exactly in this markdown structure:
@@ -34,7 +174,10 @@ def generate_feedback(interview_data):
     [Actionable advice for the candidate to improve their performance in future interviews]
     """
     
-    return call_grok_api([{"role": "system", "content": "You are a helpful and strict expert technical interviewer."}, {"role": "user", "content": prompt}], temperature=0.5)
+    messages = [{"role": "system", "content": "You are a helpful and strict expert technical interviewer."}, {"role": "user", "content": prompt}]
+    if stream:
+        return stream_grok_api(messages, temperature=0.5, call_site="feedback")
+    return call_grok_api(messages, temperature=0.5, call_site="feedback")
 
 def render_feedback():
     st.markdown("<h1 style='text-align: center;'>Interview Feedback & Analysis 📊</h1>", unsafe_allow_html=True)
@@ -47,36 +190,47 @@ def render_feedback():
             st.rerun()
         return
 
+    just_streamed = False
     if 'feedback_report' not in st.session_state:
-        with st.spinner("Analyzing your full performance... This may take a moment."):
-            report = generate_feedback(st.session_state.interview_data)
-            st.session_state.feedback_report = report
-            
-            # Save to Supabase interview_history (skip if in Guest Mode)
-            try:
-                if st.session_state.user_data.is_dev:
-                    st.info("💡 Guest Mode: Your feedback is provided below, but it will NOT be saved. Ensure you copy anything you'd like to keep before leaving this page.")
-                else:
-                    from utils.supabase_client import get_supabase
-                    supabase = get_supabase()
-                    user_id = st.session_state.user_data.id
-                    
-                    transcript = st.session_state.interview_data.get('transcript', [])
-                    consolidated_questions = "\n\n".join([f"Q{i+1}: {e['question']}" for i, e in enumerate(transcript)])
-                    consolidated_answers = "\n\n".join([f"A{i+1}: {e['answer']}" for i, e in enumerate(transcript)])
-
-                    supabase.table("interview_history").insert({
-                        "user_id": user_id,
-                        "role": st.session_state.get('interview_role', 'Unknown'),
-                        "round_type": st.session_state.interview_data['round'],
-                        "question": consolidated_questions,
-                        "user_answer": consolidated_answers,
-                        "feedback_report": report
-                    }).execute()
-            except Exception as e:
-                st.warning(f"Could not save history to database (ensure schema is deployed): {e}")
-            
-    st.markdown(st.session_state.feedback_report)
+        st.caption("Analyzing your full performance... The report appears below as it is written.")
+        try:
+            report_stream = generate_feedback(st.session_state.interview_data, stream=True)
+            report = st.write_stream(report_stream)
+        except GroqAPIError as e:
+            st.error(f"🚨 Could not generate feedback: {e}")
+            if st.button("🔄 Retry Feedback", type="primary"):
+                st.rerun()
+            return
+        st.session_state.feedback_report = report
+        st.session_state.feedback_timing = {"ttft": report_stream.ttft, "latency": report_stream.latency}
+        just_streamed = True
+        
+        # Save to Supabase interview_history (skip if in Guest Mode)
+        try:
+            if st.session_state.user_data.is_dev:
+                st.info("💡 Guest Mode: Your feedback is provided below, but it will NOT be saved. Ensure you copy anything you'd like to keep before leaving this page.")
+            else:
+                from utils.supabase_client import get_supabase
+                supabase = get_supabase()
+                user_id = st.session_state.user_data.id
+                
+                transcript = st.session_state.interview_data.get('transcript', [])
+                consolidated_questions = "\n\n".join([f"Q{i+1}: {e['question']}" for i, e in enumerate(transcript)])
+                consolidated_answers = "\n\n".join([f"A{i+1}: {e['answer']}" for i, e in enumerate(transcript)])
+
+                supabase.table("interview_history").insert({
+                    "user_id": user_id,
+                    "role": st.session_state.get('interview_role', 'Unknown'),
+                    "round_type": st.session_state.interview_data['round'],
+                    "question": consolidated_questions,
+                    "user_answer": consolidated_answers,
+                    "feedback_report": report
+                }).execute()
+        except Exception as e:
+            st.warning(f"Could not save history to database (ensure schema is deployed): {e}")
+        
+    if not just_streamed:
+        st.markdown(st.session_state.feedback_report)
     
     st.markdown("---")
     col1, col2 = st.columns(2)
@@ -84,9 +238,10 @@ def render_feedback():
         if st.button("🔙 Back to Dashboard", use_container_width=True):
             # Clean up interview state
             keys_to_clear = [
-                'interview_data', 'feedback_report', 'current_question', 'current_hr_question', 
-                'code_answer', 'answer_text', 'interview_transcript', 'code_output', 
-                'start_time', 'time_limit', 'esc_count', 'last_q_added', 'messages'
+                'interview_data', 'feedback_report', 'feedback_timing', 'current_question', 'current_hr_question', 
+                'code_answer', 'answer_text', 'hr_answer_text', 'hr_seeded_audio', 'transcriptions', 'interview_transcript', 'answer_evaluations', 'code_output', 
+                'test_cases_future', 'test_report', 'complexity_report', 'code_language', 'proctor_sessions', 
+                'start_time', 'time_limit', 'esc_count', 'last_q_added', 'messages', 'chat_context'
             ]
             for k in keys_to_clear:
                 if k in st.session_state:
@@ -1,44 +1,284 @@
 import streamlit as st
+import hashlib
+import os
+import queue
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from streamlit_ace import st_ace
-from utils.grok_api import call_grok_api
-from utils.piston_api import execute_code
+from utils.grok_api import GroqAPIError
+from utils.piston_api import execute_code, estimate_complexity, summarize_complexity
+from utils.sandbox_pool import get_python_pool
+from utils.exec_scheduler import get_exec_scheduler
+from utils.question_prefetch import get_prefetcher, generate_question, is_stdio_category, question_key, submit_test_cases
+from utils.test_harness import run_test_cases, summarize_test_results
+from utils.speech_to_text import SpeechToTextError, read_pcm, recognize_pcm, submit_transcription
+from components.feedback import submit_evaluation
+from components.proctoring import close_proctor_sessions, continuous_proctoring_enabled, render_continuous_proctoring
 import cv2
 import numpy as np
 
-# Load the pre-trained Haar Cascade for face detection
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+HAAR_FRONTAL_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+HAAR_PROFILE_PATH = cv2.data.haarcascades + 'haarcascade_profileface.xml'
+# The opencv-python wheels only ship Haar cascades; the LBP one comes from an
+# OpenCV source or system install (data/lbpcascades)
+LBP_FRONTAL_PATH = os.getenv("FACE_LBP_CASCADE") or next(
+    (path for path in (
+        os.path.join(cv2.data.haarcascades, os.pardir, 'lbpcascades', 'lbpcascade_frontalface_improved.xml'),
+        '/usr/share/opencv4/lbpcascades/lbpcascade_frontalface_improved.xml',
+        '/usr/local/share/opencv4/lbpcascades/lbpcascade_frontalface_improved.xml',
+    ) if os.path.exists(path)),
+    None
+)
+# Backend used by count_faces and proctoring; see benchmark_face_detectors.py
+FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar")
+# Detection runs on frames at most this wide. Snapshots are decoded at half
+# resolution straight from the JPEG (640x480 -> 320x240), so usually no resize
+FACE_WORK_WIDTH = 320
+# Picked on composited 640x480 webcam frames (0-3 faces): against the old
+# full-resolution 1.1/4 pass this is ~4.7x faster with the same 0/1/many
+# result on every frame. 1.2+ started missing faces.
+FACE_SCALE_FACTOR = 1.15
+FACE_MIN_NEIGHBORS = 4
+# Smallest face as a fraction of the working width: the original 30px minimum
+# on 640px frames, i.e. 15px at 320, so distant faces are still counted
+FACE_MIN_SIZE_FRACTION = 30 / 640
+
+
+class CascadePool:
+    """
+    Loaded cascades shared by every session. A CascadeClassifier must not be
+    used by two threads at once, so each detection borrows one from the pool
+    and a new copy is loaded only when all of them are busy.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._free = queue.LifoQueue()
+
+    def _load(self):
+        return cv2.CascadeClassifier(self.path)
+
+    @contextmanager
+    def acquire(self):
+        try:
+            cascade = self._free.get_nowait()
+        except queue.Empty:
+            cascade = self._load()
+        try:
+            yield cascade
+        finally:
+            self._free.put(cascade)
+
+
+def merge_boxes(boxes, overlap=0.5):
+    """Drops boxes mostly covered by a larger one (the same face found by two cascades)."""
+    kept = []
+    for x, y, w, h in sorted(boxes, key=lambda b: b[2] * b[3], reverse=True):
+        for kx, ky, kw, kh in kept:
+            ix = max(0, min(x + w, kx + kw) - max(x, kx))
+            iy = max(0, min(y + h, ky + kh) - max(y, ky))
+            if ix * iy > overlap * w * h:
+                break
+        else:
+            kept.append((x, y, w, h))
+    return kept
+
+
+class FaceDetector:
+    """
+    A detection backend: one or more cascades with their detectMultiScale
+    parameters. Profile cascades only find faces turned one way, so cascades
+    marked `mirror` also run on the flipped frame. Hits from several passes
+    are merged.
+    """
+
+    def __init__(self, name, cascades, scale_factor=FACE_SCALE_FACTOR, min_neighbors=FACE_MIN_NEIGHBORS,
+                 min_size_fraction=FACE_MIN_SIZE_FRACTION):
+        self.name = name
+        # (path, mirror) pairs
+        self.cascades = cascades
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size_fraction = min_size_fraction
+        self._pools = [(CascadePool(path), mirror) for path, mirror in cascades if path]
+        # Checked once: the cascade files do not come and go while the app runs
+        self._available = all(path and os.path.exists(path) for path, _ in cascades)
+        if not self._available:
+            print(f"Face detector '{self.name}' is missing a cascade file.")
+
+    def available(self):
+        return self._available
+
+    def detect(self, gray):
+        """Face rectangles (x, y, w, h) in `gray`, or None if a cascade could not be loaded."""
+        if not self._available:
+            return None
+        min_side = max(12, int(gray.shape[1] * self.min_size_fraction))
+        boxes = []
+        passes = 0
+        for pool, mirror in self._pools:
+            with pool.acquire() as cascade:
+                if cascade.empty():
+                    print(f"Face cascade {pool.path} is empty! Check path.")
+                    return None
+                images = [(gray, False), (cv2.flip(gray, 1), True)] if mirror else [(gray, False)]
+                for image, flipped in images:
+                    passes += 1
+                    found = cascade.detectMultiScale(
+                        image,
+                        scaleFactor=self.scale_factor,
+                        minNeighbors=self.min_neighbors,
+                        minSize=(min_side, min_side)
+                    )
+                    for x, y, w, h in found:
+                        boxes.append((gray.shape[1] - x - w if flipped else x, y, w, h))
+        return merge_boxes(boxes) if passes > 1 else boxes
+
+
+FACE_DETECTORS = {
+    "haar": FaceDetector("haar", [(HAAR_FRONTAL_PATH, False)]),
+    "lbp": FaceDetector("lbp", [(LBP_FRONTAL_PATH, False)], scale_factor=1.1, min_neighbors=3),
+    "haar_profile": FaceDetector("haar_profile", [(HAAR_FRONTAL_PATH, False), (HAAR_PROFILE_PATH, True)]),
+}
+
+
+def get_face_detector(name=None):
+    name = name or FACE_DETECTOR
+    if name not in FACE_DETECTORS:
+        print(f"Unknown face detector '{name}', using haar.")
+        name = "haar"
+    detector = FACE_DETECTORS[name]
+    if not detector.available():
+        # Already reported when the detector was built (e.g. OpenCV without lbpcascades)
+        return FACE_DETECTORS["haar"]
+    return detector
+
+
+def decode_gray(image_bytes, max_width=FACE_WORK_WIDTH):
+    """Decodes straight to half-resolution grayscale without copying the input buffer."""
+    buf = np.frombuffer(image_bytes, dtype=np.uint8)
+    gray = cv2.imdecode(buf, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+    if gray is None:
+        return None
+    if gray.shape[1] > max_width:
+        scale = max_width / gray.shape[1]
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def detect_faces(gray):
+    return get_face_detector().detect(gray)
+
 
 def count_faces(image_file):
     if image_file is None:
         return 0
     try:
-        if face_cascade.empty():
-            print("Face cascade is empty! Check path.")
-            return 1 # Fail safe: assume at least 1 person exists if we can't detect
-            
-        # Read image using getvalue() to be safer than read()
-        file_bytes = np.asarray(bytearray(image_file.getvalue()), dtype=np.uint8)
-        img = cv2.imdecode(file_bytes, 1)
-        if img is None:
+        # getbuffer() is a view of the upload; fall back to getvalue() for other file-likes
+        data = image_file.getbuffer() if hasattr(image_file, "getbuffer") else image_file.getvalue()
+        gray = decode_gray(data)
+        if gray is None:
             return 0
-        
-        # Convert to grayscale for Haar Cascade
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Detect faces with more sensitive parameters
-        # scaleFactor=1.1 (instead of 1.3) is much more sensitive
-        # minNeighbors=4 (instead of 5) allows for slightly weaker detections
-        faces = face_cascade.detectMultiScale(
-            gray, 
-            scaleFactor=1.1, 
-            minNeighbors=4,
-            minSize=(30, 30)
-        )
+        faces = detect_faces(gray)
+        if faces is None:
+            return 1 # Fail safe: assume at least 1 person exists if we can't detect
         return len(faces)
     except Exception as e:
         print(f"Face detection error: {e}")
     return 0
 
+def count_faces_in_frame(gray):
+    """Face count for an already decoded grayscale video frame (continuous proctoring)."""
+    if gray.shape[1] > FACE_WORK_WIDTH:
+        scale = FACE_WORK_WIDTH / gray.shape[1]
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    faces = detect_faces(gray)
+    return None if faces is None else len(faces)
+
+# Camera snapshots remembered per session; every widget interaction reruns the
+# script with the same snapshot, so a handful is plenty
+FACE_CACHE_SIZE = 8
+
+
+class FaceCountCache:
+    """Per-session LRU of face counts keyed by a hash of the image bytes."""
+
+    def __init__(self, max_entries=FACE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        count = self._entries.get(key)
+        if count is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return count
+
+    def put(self, key, count):
+        self._entries[key] = count
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_face_cache():
+    if 'face_count_cache' not in st.session_state:
+        st.session_state.face_count_cache = FaceCountCache()
+    return st.session_state.face_count_cache
+
+
+def cached_count_faces(image_file):
+    """count_faces, but an unchanged snapshot is only analysed once per session."""
+    if image_file is None:
+        return 0
+    data = image_file.getbuffer() if hasattr(image_file, "getbuffer") else image_file.getvalue()
+    key = hashlib.blake2b(data, digest_size=16).digest()
+    cache = get_face_cache()
+    count = cache.get(key)
+    if count is None:
+        count = count_faces(image_file)
+        cache.put(key, count)
+        stats = cache.stats()
+        print(f"Face detection: {count} face(s), cache hit rate {stats['hit_rate']:.0%} "
+              f"({stats['hits']}/{stats['hits'] + stats['misses']})")
+    return count
+
+def render_proctoring_feed(label, key):
+    """Continuous WebRTC proctoring when available, otherwise camera_input snapshots."""
+    if continuous_proctoring_enabled():
+        render_continuous_proctoring(f"{key}_stream", count_faces_in_frame,
+                                     lambda msg: end_interview(violation_msg=msg))
+        return
+
+    img = st.camera_input(label, key=key)
+    if img:
+        faces = cached_count_faces(img)
+        if faces == 1:
+            st.success("✅ Proctoring Active: Face Detected")
+        elif faces == 0:
+            st.warning("⚠️ Face Not Detected")
+        else:
+            st.error(f"🚨 {faces} Faces Detected")
+
+        if (faces > 1):
+            msg = f"SYSTEM TERMINATION: Multiple people detected ({faces} faces) in the camera feed. This is a major cheating violation."
+            st.error(f"🚨 Multiple people detected ({faces})! The interview is being terminated for cheating violation.")
+            end_interview(violation_msg=msg)
+
 def inject_tab_switching_js(remaining_seconds=None):
     timer_script = ""
     if remaining_seconds:
@@ -185,18 +425,15 @@ def check_permissions():
         if audio_check:
             with st.spinner("Verifying audio..."):
                 try:
-                    import speech_recognition as sr
-                    r = sr.Recognizer()
-                    with sr.AudioFile(audio_check) as source:
-                        audio_data = r.record(source)
-                        # Attempt recognition to confirm audio quality
-                        try:
-                            r.recognize_google(audio_data)
-                        except:
-                            pass # Even if no speech recognized, getting data confirms mic works
-                        
-                        st.success("✅ Microphone access confirmed!")
-                        st.session_state.mic_granted = True
+                    samples, rate = read_pcm(audio_check)
+                    # Attempt recognition with the configured backend to confirm audio quality
+                    try:
+                        recognize_pcm(samples, rate)
+                    except SpeechToTextError as e:
+                        print(f"Microphone check could not transcribe: {e}")  # Getting data still confirms the mic works
+
+                    st.success("✅ Microphone access confirmed!")
+                    st.session_state.mic_granted = True
                 except Exception as e:
                     st.error(f"❌ Microphone error: {e}")
                     st.session_state.mic_granted = False
@@ -228,6 +465,131 @@ def check_permissions():
     elif not st.session_state.get('mic_granted'):
         st.warning("⚠️ Microphone access is required to proceed.")
 
+TEST_CASE_WAIT_SECONDS = 30
+
+def get_test_cases(timeout=TEST_CASE_WAIT_SECONDS):
+    """Test cases for the current coding question ([] if none could be generated)."""
+    future = st.session_state.get('test_cases_future')
+    if future is None:
+        return []
+    try:
+        return future.result(timeout=timeout)
+    except Exception as e:
+        print(f"Test cases unavailable: {e}")
+        return []
+
+def exec_user_key():
+    """Identity the execution scheduler uses for per-user limits; guests share an id, so they get one per session."""
+    user = st.session_state.get('user_data')
+    if user is not None and not getattr(user, 'is_dev', False):
+        return user.id
+    if 'exec_session_id' not in st.session_state:
+        st.session_state.exec_session_id = uuid.uuid4().hex
+    return st.session_state.exec_session_id
+
+def run_scheduled(fn, *args, live_output=None, **kwargs):
+    """
+    Runs an execution job through the process-wide scheduler, showing the
+    queue position while it waits. With `live_output` (a placeholder), the
+    job's partial output is streamed into it. Returns None if rejected.
+    """
+    partial = {}
+    if live_output is not None:
+        kwargs["on_output"] = lambda stdout, stderr: partial.update(text=stdout + stderr)
+    # The job runs on a scheduler thread, so it must not touch st.* itself
+    ticket = get_exec_scheduler().submit(exec_user_key(), fn, *args, **kwargs)
+    status_box = st.empty()
+    while not ticket.wait(timeout=0.2):
+        status = ticket.status()
+        if status["state"] == "queued":
+            status_box.info(
+                f"⏳ Waiting for a free runner: position {status['position'] + 1} in queue, "
+                f"waited {status['waited']:.0f}s (about {status['estimated_wait']:.0f}s to go)"
+            )
+        else:
+            status_box.empty()
+            if live_output is not None and partial.get("text"):
+                live_output.code(partial["text"][-4000:], language="text")
+    status_box.empty()
+    if ticket.state == "rejected":
+        st.warning(f"🚦 {ticket.error}")
+        return None
+    if ticket.error:
+        return {"error": ticket.error}
+    return ticket.result
+
+def run_current_tests(language, code):
+    """Runs the code against the question's test cases, reusing the last report if the code is unchanged."""
+    cached = st.session_state.get('test_report')
+    if cached and cached["code"] == code and cached["language"] == language:
+        return cached["report"]
+    cases = get_test_cases()
+    if not cases:
+        return None
+    report = run_scheduled(run_test_cases, language, code, cases)
+    if report is not None:
+        st.session_state.test_report = {"code": code, "language": language, "report": report}
+    return report
+
+def render_test_report(report):
+    if "error" in report:
+        st.error(f"❌ {report['error']}")
+        return
+    if report["passed"] == report["total"]:
+        st.success(f"✅ All {report['total']} test cases passed")
+    else:
+        st.warning(f"⚠️ {report['passed']}/{report['total']} test cases passed")
+    st.dataframe([
+        {
+            "Case": r["index"] + 1,
+            "Result": "✅ Pass" if r["passed"] else "❌ " + (r.get("error") or "Fail"),
+            "Time (ms)": round(r["wall_time"] * 1000, 1) if r.get("wall_time") is not None else None,
+            "Peak RSS (MiB)": round(r["peak_rss_kb"] / 1024, 1) if r.get("peak_rss_kb") else None,
+            "Input": r["input"],
+            "Expected": r["expected_output"],
+            "Output": r.get("stdout", ""),
+        }
+        for r in report["results"]
+    ], use_container_width=True, hide_index=True)
+
+def is_dsa_round():
+    return "DSA" in st.session_state.get('interview_category', 'DSA (LeetCode Style)')
+
+def is_stdio_round():
+    """Questions with a stdin/stdout answer that can be checked against test cases."""
+    return is_stdio_category(st.session_state.get('interview_category', 'DSA (LeetCode Style)'))
+
+def profile_current_code(language, code):
+    """Empirical complexity of the code, reusing the last profile if the code is unchanged."""
+    cached = st.session_state.get('complexity_report')
+    if cached and cached["code"] == code and cached["language"] == language:
+        return cached["report"]
+    report = run_scheduled(estimate_complexity, language, code)
+    if report is not None:
+        st.session_state.complexity_report = {"code": code, "language": language, "report": report}
+    return report
+
+def render_complexity_report(report):
+    if "error" in report:
+        st.info(f"📈 {report['error']}")
+        return
+    st.markdown(f"**Estimated complexity:** `{report['estimate']}` (confidence {report['confidence']:.0%})")
+    st.line_chart({"n": [t["n"] for t in report["timings"]],
+                   "ms per call": [t["seconds"] * 1000 for t in report["timings"]]}, x="n", y="ms per call")
+
+def record_answer(question, answer, measure=None):
+    """
+    Appends an answer to the transcript and starts grading it in the
+    background, after `measure` (see measure_current_answer) if given.
+    """
+    entry = {"question": question, "answer": answer}
+    st.session_state.interview_transcript.append(entry)
+    if 'answer_evaluations' not in st.session_state:
+        st.session_state.answer_evaluations = []
+    st.session_state.answer_evaluations.append(
+        submit_evaluation(st.session_state.get('interview_round', 'General'), entry, measure)
+    )
+
 def end_interview(violation_msg=None):
     # Finalize the transcript with the last answered question if it exists
     if 'current_question' in st.session_state or 'current_hr_question' in st.session_state:
@@ -235,16 +597,102 @@ def end_interview(violation_msg=None):
         # Only add if it wasn't already added (we use a flag to prevent duplicates if user clicks End after Next)
         if q and not st.session_state.get('last_q_added', False):
              ans = violation_msg or st.session_state.get('code_answer') or st.session_state.get('answer_text', 'No answer provided.')
-             st.session_state.interview_transcript.append({"question": q, "answer": ans})
+             measure = None
+             if not violation_msg and st.session_state.get('current_question'):
+                 measure = measure_current_answer()
+             record_answer(q, ans, measure)
              st.session_state.last_q_added = True
 
+    close_proctor_sessions()
     st.session_state.interview_data = {
         "transcript": st.session_state.interview_transcript,
+        "evaluations": st.session_state.get('answer_evaluations', []),
         "round": st.session_state.get('interview_round', 'General')
     }
     st.session_state.current_page = 'feedback'
     st.rerun()
 
+def next_question(default_category):
+    """
+    Serves the next question from the background prefetch pool, falling back to
+    generating it inline when the pool for this setup is still empty.
+    """
+    key = question_key(
+        st.session_state.interview_role,
+        st.session_state.get('interview_round', 'Technical Round'),
+        st.session_state.get('interview_category', default_category),
+        st.session_state.get('interview_difficulty', 'Medium')
+    )
+    # take() also tops the pool back up, so question N+1 is generated while
+    # the candidate works on question N.
+    question = get_prefetcher().take(key)
+    if question is None:
+        question = generate_question(key)
+    return question
+
+def run_unattended(user, fn, *args):
+    """
+    run_scheduled for background threads: no progress UI, and the job goes in
+    the user's background lane so it is not rejected by their interactive
+    runs. Returns (result, error); result is None if rejected or failed.
+    """
+    ticket = get_exec_scheduler().submit_background(user, fn, *args)
+    ticket.wait()
+    if ticket.error:
+        print(f"Background execution job not run: {ticket.error}")
+    return ticket.result, ticket.error
+
+def measure_current_answer():
+    """
+    Snapshots what is needed to test and profile the current coding answer
+    and returns a function that does it off the page thread, giving the
+    summaries for the grader plus a "not_measured" note for whatever could
+    not be measured. None if there is no code to measure.
+    """
+    code = st.session_state.get('code_answer', '')
+    if not code.strip() or code.strip() == "# Write your code here":
+        return None
+    language = st.session_state.get('code_language', 'python')
+    user = exec_user_key()
+    cases_future = st.session_state.get('test_cases_future')
+    profile = is_dsa_round()
+
+    def cached(key):
+        report = st.session_state.get(key)
+        if report and report["code"] == code and report["language"] == language:
+            return report["report"]
+        return None
+    test_report, complexity_report = cached('test_report'), cached('complexity_report')
+
+    def measure():
+        not_measured = []
+        tests = test_report
+        if tests is None and cases_future is not None:
+            try:
+                cases = cases_future.result(timeout=TEST_CASE_WAIT_SECONDS)
+            except Exception as e:
+                print(f"Test cases unavailable: {e}")
+                cases = []
+            if cases:
+                tests, error = run_unattended(user, run_test_cases, language, code, cases)
+                if error:
+                    not_measured.append(f"Tests were not run: {error}")
+            else:
+                not_measured.append("Tests were not run: no test cases could be generated.")
+        complexity = complexity_report
+        if complexity is None and profile:
+            complexity, error = run_unattended(user, estimate_complexity, language, code)
+            if error:
+                not_measured.append(f"Complexity was not measured: {error}")
+        if complexity and "error" in complexity:
+            not_measured.append(f"Complexity was not measured: {complexity['error']}")
+        return {
+            "test_results": summarize_test_results(tests) if tests else None,
+            "complexity": summarize_complexity(complexity) if complexity and "error" not in complexity else None,
+            "not_measured": "\n".join(not_measured) or None,
+        }
+    return measure
+
 def display_interview_history():
     if st.session_state.interview_transcript:
         st.markdown("### 📜 Interview History")
@@ -259,6 +707,8 @@ def display_interview_history():
         st.markdown("---")
 
 def render_technical_round():
+    # Start the warm Python workers before the first "Run Code" click
+    get_python_pool()
     display_interview_history()
     
     # Split layout: Question/Editor on left, small camera on the right
@@ -269,17 +719,20 @@ def render_technical_round():
         
         if 'current_question' not in st.session_state:
             with st.spinner("Generating question..."):
-                dif = st.session_state.get('interview_difficulty', 'Medium')
-                cat = st.session_state.get('interview_category', 'DSA (LeetCode Style)')
-                prompt = (
-                    f"Generate a {dif} difficulty coding interview question in the category of '{cat}' for a {st.session_state.interview_role} role. "
-                    "If the category is DSA, focus on a high-quality problem (e.g., Arrays, Strings, Trees, DP) that is commonly asked in real interviews. "
-                    "Keep the question text and requirements EXTREMELY CONCISE (max 3-4 sentences total). "
-                    "Return ONLY the question text and requirements, no code."
-                )
-                question = call_grok_api([{"role": "user", "content": prompt}])
+                try:
+                    question = next_question('DSA (LeetCode Style)')
+                except GroqAPIError as e:
+                    st.error(f"🚨 Could not generate a question: {e}")
+                    if st.button("🔄 Retry", key="btn_retry_tech_q"):
+                        st.rerun()
+                    return
                 st.session_state.current_question = question
                 st.session_state.code_answer = "# Write your code here\n"
+                # Test cases are generated while the candidate reads and codes
+                st.session_state.test_cases_future = submit_test_cases(
+                    question, st.session_state.get('interview_category', 'DSA (LeetCode Style)'))
+                st.session_state.pop('test_report', None)
+                st.session_state.pop('complexity_report', None)
         
         st.info(st.session_state.current_question)
         
@@ -289,6 +742,7 @@ def render_technical_round():
         with col_lang:
             languages = ["python", "javascript", "c_cpp", "java", "csharp", "c"]
             selected_lang = st.selectbox("Select Language", options=languages, index=0)
+            st.session_state.code_language = selected_lang
         
         code = st_ace(
             value=st.session_state.code_answer,
@@ -303,6 +757,9 @@ def render_technical_round():
         if code != st.session_state.code_answer:
             st.session_state.code_answer = code
 
+        # Partial output is streamed here while the program is still running
+        live_output = st.empty()
+
         with col_run:
             st.write("") # Spacer
             st.write("") # Spacer
@@ -314,17 +771,32 @@ def render_technical_round():
                      st.warning("⚠️ Please write some code before running.")
                 else:
                     with st.spinner("Executing..."):
-                        result = execute_code(selected_lang, code)
-                        if "error" in result:
+                        result = run_scheduled(execute_code, selected_lang, code, live_output=live_output)
+                        live_output.empty()
+                        if result is None:
+                            pass
+                        elif "error" in result:
                             st.error(f"Execution Error: {result['error']}")
+                            partial = result.get("stdout", "") + result.get("stderr", "")
+                            if partial:
+                                live_output.code(partial[-4000:], language="text")
                         else:
                             st.session_state.code_output = result
+            if is_stdio_round() and st.button("🧪 Run Tests", use_container_width=True):
+                with st.spinner("Running test cases..."):
+                    if run_current_tests(selected_lang, code) is None and not get_test_cases(timeout=0):
+                        st.warning("⚠️ No test cases are available for this question.")
+            if is_dsa_round() and st.button("📈 Estimate Complexity", use_container_width=True):
+                with st.spinner("Profiling on growing inputs..."):
+                    profile_current_code(selected_lang, code)
         
         if "code_output" in st.session_state:
             res = st.session_state.code_output
             if isinstance(res, dict) and "error" in res:
                 st.error(f"❌ {res['error']}")
             elif isinstance(res, dict):
+                if res.get("cached"):
+                    st.caption("⚡ Unchanged code and input: result served from cache")
                 if res.get("code", 0) != 0:
                     st.error(f"⚠️ Execution Failed (Exit Code {res['code']})")
                     if res.get("stderr"):
@@ -344,58 +816,89 @@ def render_technical_round():
                 # Fallback for old state format
                 st.markdown("#### Execution Output")
                 st.code(res, language="text")
+
+        cached_tests = st.session_state.get('test_report')
+        if cached_tests and cached_tests["code"] == code:
+            st.markdown("#### Test Results")
+            render_test_report(cached_tests["report"])
+
+        cached_profile = st.session_state.get('complexity_report')
+        if cached_profile and cached_profile["code"] == code:
+            st.markdown("#### Complexity Profile")
+            render_complexity_report(cached_profile["report"])
             
     with col_cam:
         # Consistency: Tech round now also has webcam proctoring
-        img = st.camera_input("Proctoring Feed", key="tech_cam_input")
-        if img:
-            faces = count_faces(img)
-            if faces == 1:
-                st.success("✅ Proctoring Active: Face Detected")
-            elif faces == 0:
-                st.warning("⚠️ Face Not Detected")
-            else:
-                st.error(f"🚨 {faces} Faces Detected")
-
-            if (faces > 1):
-                msg = f"SYSTEM TERMINATION: Multiple people detected ({faces} faces) in the camera feed. This is a major cheating violation."
-                st.error(f"🚨 Multiple people detected ({faces})! The interview is being terminated for cheating violation.")
-                import time
-                time.sleep(3)
-                end_interview(violation_msg=msg)
-        
-    
+        render_proctoring_feed("Proctoring Feed", "tech_cam_input")
+
+
     col_btn1, col_btn2 = st.columns(2)
     with col_btn1:
         if st.button("➕ Ask Next Question", key="btn_next_tech", use_container_width=True):
-            st.session_state.interview_transcript.append({
-                "question": st.session_state.current_question,
-                "answer": st.session_state.code_answer
-            })
+            # Tests and profiling run with the grading, so the next question is not held up
+            record_answer(st.session_state.current_question, st.session_state.code_answer, measure_current_answer())
             # Clear current question to trigger new generation
             del st.session_state.current_question
             del st.session_state.code_answer
             if "code_output" in st.session_state: del st.session_state.code_output
+            st.session_state.pop('test_cases_future', None)
+            st.session_state.pop('test_report', None)
+            st.session_state.pop('complexity_report', None)
             st.rerun()
             
     with col_btn2:
         if st.button("🏁 End Interview & Get Feedback", key="btn_end_tech", type="primary", use_container_width=True):
             end_interview()
 
+# Recordings whose transcripts are remembered per session
+TRANSCRIPT_CACHE_SIZE = 8
+
+
+def get_transcription(audio_file):
+    """
+    Returns (audio hash, TranscriptionJob) for a recording. A new recording is
+    submitted for background transcription once; reruns with the same clip
+    reuse the job.
+    """
+    data = audio_file.getvalue()
+    key = hashlib.blake2b(data, digest_size=16).hexdigest()
+    jobs = st.session_state.setdefault('transcriptions', OrderedDict())
+    if key in jobs:
+        jobs.move_to_end(key)
+    else:
+        jobs[key] = submit_transcription(data)
+        while len(jobs) > TRANSCRIPT_CACHE_SIZE:
+            jobs.popitem(last=False)
+    return key, jobs[key]
+
+
+def wait_for_transcription(answer_box, job):
+    """Blocks until the job finishes, showing its partial text in `answer_box`."""
+    shown = None
+    with st.spinner("Transcribing audio..."):
+        while not job.wait(timeout=0.25):
+            if job.text and job.text != shown:
+                shown = job.text
+                answer_box.text_area("Type or edit your answer here...", value=shown, height=150,
+                                     disabled=True, key=f"hr_transcript_partial_{job.result.completed}")
+    if job.error:
+        st.error(f"🚨 Transcription failed: {job.error}")
+    elif not job.text:
+        st.warning("Could not understand audio. Try speaking clearer.")
+
 def render_hr_round():
     display_interview_history()
     st.markdown(f"### HR / Behavioral Round - Question {len(st.session_state.interview_transcript) + 1}")
     
     if 'current_hr_question' not in st.session_state:
         with st.spinner("Generating question..."):
-            dif = st.session_state.get('interview_difficulty', 'Medium')
-            cat = st.session_state.get('interview_category', 'Project-based Scenario')
-            prompt = (
-                f"Generate a {dif} difficulty behavioral/HR interview question focused on '{cat}' for a {st.session_state.interview_role} role. "
-                "The question should be a realistic industry scenario and concise (max 2 sentences). "
-                "Return ONLY the question text."
-            )
-            question = call_grok_api([{"role": "user", "content": prompt}])
+            try:
+                question = next_question('Project-based Scenario')
+            except GroqAPIError as e:
+                st.error(f"🚨 Could not generate a question: {e}")
+                if st.button("🔄 Retry", key="btn_retry_hr_q"):
+                    st.rerun()
+                return
             st.session_state.current_hr_question = question
             
     # Split layout: Question/Answer on left, small camera on the right
@@ -407,55 +910,37 @@ def render_hr_round():
         st.markdown("#### Voice Answer (Optional)")
         audio_val = st.audio_input("Record your answer via microphone 🎤", key="hr_audio_input")
         
-        transcribed_text = ""
-        if audio_val:
-            with st.spinner("Transcribing audio..."):
-                try:
-                    import speech_recognition as sr
-                    r = sr.Recognizer()
-                    with sr.AudioFile(audio_val) as source:
-                        audio_data = r.record(source)
-                        transcribed_text = r.recognize_google(audio_data)
-                except sr.RequestError:
-                    st.error("🚨 Speech API connection error. Please check your internet.")
-                except sr.UnknownValueError:
-                    st.warning("Could not understand audio. Try speaking clearer.")
-                except Exception as e:
-                    st.error(f"🚨 Microphone Error: {e}. Please ensure permissions are granted.")
-                    
         st.markdown("#### Your Final Answer")
+        answer_box = st.empty()
+        if audio_val:
+            audio_key, job = get_transcription(audio_val)
+            # Only a new recording fills the answer box; later reruns keep the candidate's edits
+            if st.session_state.get('hr_seeded_audio') != audio_key:
+                wait_for_transcription(answer_box, job)
+                if job.text:
+                    st.session_state.hr_answer_text = job.text
+                st.session_state.hr_seeded_audio = audio_key
+            if job.result and job.result.done:
+                st.caption(f"🎙️ {job.result.audio_seconds:.0f}s transcribed in {job.result.elapsed:.1f}s "
+                           f"({job.result.backend}, RTF {job.result.rtf:.2f})")
+                if len(job.result.segments) > 1:
+                    with st.expander("Transcript by timestamp"):
+                        st.text("\n".join(job.result.timestamped()))
+
         # Auto-fills with voice transcription if provided, otherwise blank for typing
-        answer_text = st.text_area("Type or edit your answer here...", value=transcribed_text, height=150)
+        answer_text = answer_box.text_area("Type or edit your answer here...", key="hr_answer_text", height=150)
         st.session_state.answer_text = answer_text
         
     with col_cam:
-        img = st.camera_input("Webcam Feed", key="hr_cam_input")
-        if img:
-            faces = count_faces(img)
-            if faces == 1:
-                st.success("✅ Proctoring Active: Face Detected")
-            elif faces == 0:
-                st.warning("⚠️ Face Not Detected")
-            else:
-                st.error(f"🚨 {faces} Faces Detected")
-
-            if (faces > 1):
-                msg = f"SYSTEM TERMINATION: Multiple people detected ({faces} faces) in the camera feed. This is a major cheating violation."
-                st.error(f"🚨 Multiple people detected ({faces})! The interview is being terminated for cheating violation.")
-                import time
-                time.sleep(3)
-                end_interview(violation_msg=msg)
-    
-    
+        render_proctoring_feed("Webcam Feed", "hr_cam_input")
+
     col_btn1, col_btn2 = st.columns(2)
     with col_btn1:
         if st.button("➕ Ask Next Question", key="btn_next_hr", use_container_width=True):
-            st.session_state.interview_transcript.append({
-                "question": st.session_state.current_hr_question,
-                "answer": st.session_state.answer_text
-            })
+            record_answer(st.session_state.current_hr_question, st.session_state.answer_text)
             del st.session_state.current_hr_question
             del st.session_state.answer_text
+            st.session_state.pop('hr_answer_text', None)
             st.rerun()
             
     with col_btn2:
@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import streamlit as st
+
+try:
+    from streamlit_webrtc import WebRtcMode, webrtc_streamer
+    WEBRTC_AVAILABLE = True
+except ImportError:  # Optional: fall back to st.camera_input snapshots
+    WEBRTC_AVAILABLE = False
+
+# "continuous" streams the webcam over WebRTC; "snapshot" keeps st.camera_input
+PROCTORING_MODE = os.getenv("PROCTORING_MODE", "continuous")
+# Frames analysed per second per session; the rest are dropped on arrival
+PROCTOR_SAMPLE_FPS = float(os.getenv("PROCTOR_SAMPLE_FPS", "2"))
+# Frames are downsampled to this width before they are queued
+PROCTOR_FRAME_WIDTH = 320
+# Consecutive frames with the same face count before the status changes;
+# a violation needs this many multi-face frames in a row
+PROCTOR_CONFIRM_FRAMES = int(os.getenv("PROCTOR_CONFIRM_FRAMES", "3"))
+# Detection threads shared by all sessions in the process
+PROCTOR_WORKERS = int(os.getenv("PROCTOR_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# How often the page polls a session for new status and events
+PROCTOR_POLL_SECONDS = 1.0
+MAX_EVENTS = 50
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_proctoring_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=PROCTOR_WORKERS, thread_name_prefix="proctor")
+    return _pool
+
+
+def classify(faces):
+    if faces is None:
+        return "unknown"
+    return "none" if faces == 0 else "one" if faces == 1 else "many"
+
+
+class ProctorSession:
+    """
+    Face monitoring for one candidate. `on_frame` runs on the WebRTC thread and
+    only samples; detection runs on the shared pool with at most one frame in
+    flight per session, so a session costs at most PROCTOR_SAMPLE_FPS
+    detections per second however fast the camera is. The status only changes
+    after `confirm_frames` consecutive frames agree.
+
+    `detect(gray)` returns a face count (None if detection is unavailable); it
+    is passed in so this module does not import components.interview.
+    """
+
+    def __init__(self, detect, sample_fps=PROCTOR_SAMPLE_FPS, confirm_frames=PROCTOR_CONFIRM_FRAMES):
+        self.detect = detect
+        self.sample_interval = 1.0 / sample_fps
+        self.confirm_frames = confirm_frames
+        self.started_at = time.monotonic()
+        self.status = "unknown"
+        self.faces = None
+        self.violation = None
+        self.frames_seen = 0
+        self.frames_dropped = 0
+        self.frames_analysed = 0
+        self.cpu_seconds = 0.0
+        self.closed = False
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._streak_kind = None
+        self._streak = 0
+        self._last_sample = 0.0
+        self._in_flight = False
+        self._lock = threading.Lock()
+
+    def on_frame(self, frame):
+        """streamlit-webrtc video_frame_callback: returns the frame unchanged."""
+        now = time.monotonic()
+        with self._lock:
+            self.frames_seen += 1
+            if self.closed or now - self._last_sample < self.sample_interval:
+                return frame
+            if self._in_flight:
+                # Previous frame still being analysed: skip rather than queue up
+                self.frames_dropped += 1
+                return frame
+            self._last_sample = now
+            self._in_flight = True
+        try:
+            gray = frame.to_ndarray(format="gray")
+            if gray.shape[1] > PROCTOR_FRAME_WIDTH:
+                scale = PROCTOR_FRAME_WIDTH / gray.shape[1]
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            get_proctoring_pool().submit(self._analyse, gray)
+        except Exception as e:
+            print(f"Proctoring frame error: {e}")
+            with self._lock:
+                self._in_flight = False
+        return frame
+
+    def _analyse(self, gray):
+        cpu_start = time.thread_time()
+        try:
+            faces = self.detect(gray)
+        except Exception as e:
+            print(f"Proctoring detection error: {e}")
+            faces = None
+        cpu = time.thread_time() - cpu_start
+        with self._lock:
+            self._in_flight = False
+            self.frames_analysed += 1
+            self.cpu_seconds += cpu
+            self.faces = faces
+            self._observe(classify(faces))
+
+    def _observe(self, kind):
+        if kind == self._streak_kind:
+            self._streak += 1
+        else:
+            self._streak_kind, self._streak = kind, 1
+        if self._streak < self.confirm_frames or kind == self.status:
+            return
+        self.status = kind
+        self._events.append({"time": time.time(), "status": kind, "faces": self.faces})
+        if kind == "many" and self.violation is None:
+            self.violation = (f"SYSTEM TERMINATION: Multiple people detected ({self.faces} faces) in "
+                              f"{self.confirm_frames} consecutive camera frames. This is a major cheating violation.")
+
+    def drain_events(self):
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        stats = self.stats()
+        print(f"Proctoring session closed: {stats['frames_analysed']} frames analysed, "
+              f"{stats['cpu_seconds']:.2f}s CPU ({stats['cpu_percent']:.1f}% of one core)")
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            return {
+                "status": self.status,
+                "faces": self.faces,
+                "frames_seen": self.frames_seen,
+                "frames_dropped": self.frames_dropped,
+                "frames_analysed": self.frames_analysed,
+                "cpu_seconds": self.cpu_seconds,
+                "cpu_percent": 100.0 * self.cpu_seconds / elapsed,
+                "ms_per_frame": 1000.0 * self.cpu_seconds / self.frames_analysed if self.frames_analysed else 0.0,
+            }
+
+
+def continuous_proctoring_enabled():
+    return WEBRTC_AVAILABLE and PROCTORING_MODE == "continuous"
+
+
+def get_proctor_session(key, detect):
+    sessions = st.session_state.setdefault('proctor_sessions', {})
+    if key not in sessions:
+        sessions[key] = ProctorSession(detect)
+    return sessions[key]
+
+
+def close_proctor_sessions():
+    for session in st.session_state.pop('proctor_sessions', {}).values():
+        session.close()
+
+
+def render_continuous_proctoring(key, detect, on_violation):
+    """
+    Live webcam widget plus a status panel that polls the session every
+    PROCTOR_POLL_SECONDS. `on_violation(msg)` is called from the poll once a
+    multi-face violation is confirmed.
+    """
+    session = get_proctor_session(key, detect)
+    ctx = webrtc_streamer(
+        key=key,
+        mode=WebRtcMode.SENDRECV,
+        video_frame_callback=session.on_frame,
+        media_stream_constraints={"video": {"width": {"ideal": 640}, "frameRate": {"ideal": 15}}, "audio": False},
+        async_processing=True,
+    )
+
+    @st.fragment(run_every=PROCTOR_POLL_SECONDS if ctx.state.playing else None)
+    def status_panel():
+        for event in session.drain_events():
+            print(f"Proctoring event ({key}): {event['status']} ({event['faces']} faces)")
+        if session.violation:
+            st.error("🚨 Multiple people detected! The interview is being terminated for cheating violation.")
+            on_violation(session.violation)
+            return
+        stats = session.stats()
+        if not ctx.state.playing:
+            st.info("Start the camera to begin proctoring.")
+        elif stats["status"] == "one":
+            st.success("✅ Proctoring Active: Face Detected")
+        elif stats["status"] == "none":
+            st.warning("⚠️ Face Not Detected")
+        elif stats["status"] == "many":
+            st.error(f"🚨 {stats['faces']} Faces Detected")
+        else:
+            st.caption("Checking camera feed...")
+        if stats["frames_analysed"]:
+            st.caption(f"{stats['frames_analysed']} frames checked · {stats['ms_per_frame']:.0f} ms/frame · "
+                       f"{stats['cpu_percent']:.1f}% CPU")
+
+    status_panel()
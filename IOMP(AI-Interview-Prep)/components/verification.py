@@ -1,7 +1,7 @@
 import streamlit as st
 import numpy as np
 import cv2
-from components.interview import count_faces
+from components.interview import cached_count_faces
 
 def render_verification():
     st.markdown("<h2 style='text-align: center;'>🛡️ Secure Verification</h2>", unsafe_allow_html=True)
@@ -18,7 +18,7 @@ def render_verification():
         face_count = 0
         if cam_photo:
             with st.spinner("Checking for faces..."):
-                face_count = count_faces(cam_photo)
+                face_count = cached_count_faces(cam_photo)
                 if face_count == 1:
                     st.success("✅ Identity Verified: 1 Face Detected")
                 elif face_count == 0:
@@ -0,0 +1,46 @@
+"""
+Automated checks of GroqClient streaming against the local stub server
+(utils/llm_stub_server.py); no network or API key needed.
+
+    python -m unittest test_grok_stream
+"""
+import unittest
+
+from utils.grok_api import GroqClient
+from utils.llm_stub_server import StubBackend, start_stub_server
+
+
+class FixedBackend(StubBackend):
+    """Answers every request with the same text, with no simulated latency."""
+
+    def __init__(self, content):
+        super().__init__(profile="instant")
+        self.content = content
+
+    def complete(self, body):
+        return self.content
+
+
+class GroqStreamTest(unittest.TestCase):
+    def stream(self, content):
+        server = start_stub_server(FixedBackend(content))
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = GroqClient(api_key="test", base_url=server.url)
+        return client.stream([{"role": "user", "content": "Grade this"}], cache=False)
+
+    def test_non_ascii_tokens_arrive_intact(self):
+        # "✅" is E2 9C 85 in UTF-8; decoded as Latin-1, 0x85 is a line break
+        content = "Score – 8/10 ✅ café, naïve approach → O(n²) 日本語"
+        stream = self.stream(content)
+        self.assertEqual("".join(stream), content)
+        self.assertEqual(stream.content, content)
+        self.assertGreater(stream.usage.get("total_tokens", 0), 0)
+
+    def test_ascii_stream_is_reassembled(self):
+        stream = self.stream("Use a hash map for O(n) lookups.")
+        self.assertEqual("".join(stream), "Use a hash map for O(n) lookups.")
+
+
+if __name__ == "__main__":
+    unittest.main()
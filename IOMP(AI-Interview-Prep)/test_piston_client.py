@@ -0,0 +1,97 @@
+"""
+Automated checks of utils/piston_client.py against local mock Piston
+instances (utils/piston_mock_server.py); no network needed.
+
+    python -m unittest test_piston_client
+"""
+import unittest
+
+from utils.piston_client import MAX_CONSECUTIVE_FAILURES, PistonClient, PistonUnavailable
+from utils.piston_mock_server import start_mock_piston
+
+JS_PAYLOAD = {"language": "javascript", "version": "18.15.0", "files": [{"content": "console.log(1)"}]}
+
+
+class PistonClientTest(unittest.TestCase):
+    def setUp(self):
+        self.fast = start_mock_piston(latency=0.0)
+        self.slow = start_mock_piston(latency=0.05)
+        self.servers = [self.fast, self.slow]
+        # No background prober: the tests probe explicitly
+        self.client = PistonClient([self.slow.url, self.fast.url], probe_interval=None, timeout=5)
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def test_routes_to_lowest_latency_instance(self):
+        for _ in range(3):
+            self.client.probe_all()
+        self.assertEqual(self.client.ranked_instances()[0].url, self.fast.url)
+
+        for _ in range(5):
+            self.client.execute(JS_PAYLOAD)
+        self.assertEqual(self.fast.executions, 5)
+        self.assertEqual(self.slow.executions, 0)
+        self.assertEqual(self.client.failovers, 0)
+
+    def test_slowdown_moves_traffic_once_the_average_catches_up(self):
+        self.client.probe_all()
+        self.fast.behaviour["latency"] = 0.2
+        self.client.probe_all()
+        # One slow sample only moves the moving average part of the way
+        fast = next(i for i in self.client.instances if i.url == self.fast.url)
+        self.assertLess(fast.latency, 0.2)
+        for _ in range(5):
+            self.client.probe_all()
+        self.assertEqual(self.client.ranked_instances()[0].url, self.slow.url)
+
+    def test_fails_over_and_takes_failing_instance_out_of_rotation(self):
+        self.client.probe_all()
+        self.fast.behaviour["status"] = 503
+
+        result = self.client.execute(JS_PAYLOAD)
+        self.assertEqual(result["run"]["code"], 0)
+        self.assertEqual(self.client.failovers, 1)
+        self.assertEqual(self.slow.executions, 1)
+
+        for _ in range(MAX_CONSECUTIVE_FAILURES):
+            self.client.execute(JS_PAYLOAD)
+        fast = next(i for i in self.client.snapshot()["instances"] if i["url"] == self.fast.url)
+        self.assertFalse(fast["healthy"])
+        self.assertEqual(fast["last_status"], 503)
+        # Once unhealthy it is ranked last, so requests stop failing over
+        failovers = self.client.failovers
+        self.client.execute(JS_PAYLOAD)
+        self.assertEqual(self.client.failovers, failovers)
+
+        # A successful probe puts it back into rotation
+        self.fast.behaviour["status"] = None
+        self.client.probe_all()
+        fast = next(i for i in self.client.snapshot()["instances"] if i["url"] == self.fast.url)
+        self.assertTrue(fast["healthy"])
+        self.assertEqual(fast["consecutive_failures"], 0)
+
+    def test_raises_when_every_instance_fails(self):
+        self.fast.behaviour["status"] = 503
+        self.slow.behaviour["status"] = 401
+        with self.assertRaises(PistonUnavailable) as raised:
+            self.client.execute(JS_PAYLOAD)
+        self.assertEqual(raised.exception.statuses, {self.fast.url: 503, self.slow.url: 401})
+
+    def test_request_errors_are_not_failed_over(self):
+        self.client.probe_all()
+        with self.assertRaises(Exception):
+            self.client.execute({"language": "cobol", "version": "1", "files": [{"content": ""}]})
+        self.assertEqual(self.client.failovers, 0)
+        self.assertTrue(all(i["healthy"] for i in self.client.snapshot()["instances"]))
+
+    def test_executes_python_through_the_mock(self):
+        result = self.client.execute({"language": "python", "version": "3.10.0",
+                                      "files": [{"content": "print(input()[::-1])"}], "stdin": "abc\n"})
+        self.assertEqual(result["run"]["stdout"], "cba\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,20 @@
-import requests
+"""
+Probes Piston instances through utils/piston_client.py.
 
-urls = [
+    python test_piston_search.py                 # three local mock instances
+    python test_piston_search.py --urls URL ...  # real instances
+
+With mocks it also takes the fastest instance down halfway through to show
+failover. Prints per-instance health and the Prometheus metrics at the end.
+"""
+import argparse
+import collections
+import time
+
+from utils.piston_client import PistonClient, PistonUnavailable
+from utils.piston_mock_server import start_mock_piston
+
+CANDIDATE_URLS = [
     "https://piston.kalkis.me/api/v2/execute",
     "https://execution.piston.engineer/api/v2/execute",
     "https://piston.sh/api/v2/execute",
@@ -13,13 +27,60 @@ payload = {
     "files": [{"content": "print('test')"}]
 }
 
-for url in urls:
-    try:
-        print(f"Testing {url}...")
-        response = requests.post(url, json=payload, timeout=5)
-        print(f"Status: {response.status_code}")
-        if response.status_code == 200:
-            print(f"Success! Result: {response.text}")
-            break
-    except Exception as e:
-        print(f"Failed: {e}")
+
+def run_requests(client, count, served):
+    failures = 0
+    for _ in range(count):
+        ranked = client.ranked_instances()
+        try:
+            result = client.execute(payload)
+            assert result["run"]["stdout"] == "test\n", result
+            served[ranked[0].url] += 1
+        except PistonUnavailable as e:
+            failures += 1
+            print(f"Failed: {e}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", nargs="*", help="Piston execute URLs to probe (default: local mocks)")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    mocks = []
+    if args.urls is None:
+        mocks = [
+            start_mock_piston(latency=0.01),
+            start_mock_piston(latency=0.08),
+            start_mock_piston(latency=0.02, fail_rate=0.3),
+        ]
+        urls = [m.url for m in mocks]
+    else:
+        urls = args.urls or CANDIDATE_URLS
+
+    client = PistonClient(urls, probe_interval=None)
+    print("Probing instances...")
+    client.probe_all()
+    for instance in client.ranked_instances():
+        print(f"  {instance.url}: healthy={instance.healthy} status={instance.last_status} latency={instance.latency}")
+
+    served = collections.Counter()
+    start = time.perf_counter()
+    failures = run_requests(client, args.requests // 2, served)
+    if mocks:
+        print(f"Taking {mocks[0].url} down")
+        mocks[0].behaviour["status"] = 503
+    failures += run_requests(client, args.requests - args.requests // 2, served)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{args.requests - failures}/{args.requests} requests succeeded in {elapsed:.2f}s "
+          f"({client.failovers} failovers)")
+    for url, count in served.most_common():
+        print(f"  {count:3d} first tried on {url}")
+    print()
+    print(client.export_prometheus())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.grok_api import call_grok_api, estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 4000
+DEFAULT_KEEP_TURNS = 4
+
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+
+def summarize_turns(previous_summary, turns):
+    transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in turns)
+    prompt = (
+        "You maintain a running summary of a coaching conversation between a candidate and an AI Interview Coach. "
+        "Merge the new turns into the existing summary. Keep facts the coach may need later "
+        "(questions asked, weaknesses discussed, advice given, practice tasks). Max 150 words.\n\n"
+        f"Existing summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+    return call_grok_api([{"role": "user", "content": prompt}], temperature=0.3, priority="background", call_site="chat_summary")
+
+
+class ChatContext:
+    """
+    Builds the message list sent to the LLM for one chat turn. The system
+    prompt and the last `keep_turns` user/assistant exchanges are sent
+    verbatim; older turns are folded into a running summary that is generated
+    on a background thread, so a turn never waits for summarization.
+    """
+
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, keep_turns=DEFAULT_KEEP_TURNS):
+        self.token_budget = token_budget
+        self.keep_messages = keep_turns * 2
+        self.summary = ""
+        # Index into the message history of the first turn not yet in the summary
+        self.summarized_upto = 1
+        self.last_token_count = 0
+        self._pending = None
+        self._pending_upto = None
+
+    def _collect_summary(self):
+        if self._pending is None or not self._pending.done():
+            return
+        try:
+            self.summary = self._pending.result()
+            self.summarized_upto = self._pending_upto
+        except Exception as e:
+            # Keep the old summary; the turns are retried with the next request
+            print(f"Chat summarization failed: {e}")
+        self._pending = None
+
+    def _schedule_summary(self, messages, upto):
+        if self._pending is not None:
+            return
+        turns = messages[self.summarized_upto:upto]
+        self._pending_upto = upto
+        self._pending = _summary_executor.submit(summarize_turns, self.summary, turns)
+
+    def build_request(self, messages):
+        """`messages` is the full history with the system prompt at index 0."""
+        self._collect_summary()
+        system = messages[0]
+        tail = messages[self.summarized_upto:]
+
+        if len(tail) > self.keep_messages:
+            self._schedule_summary(messages, len(messages) - self.keep_messages)
+
+        head = [system]
+        if self.summary:
+            head.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+
+        # Turns not yet in the summary are all sent (the previous summary plus
+        # the full unsummarized tail) until the new summary lands. Only the
+        # token budget trims them, oldest first; the latest message is always
+        # kept so the request is never empty.
+        while len(tail) > 1 and estimate_tokens(head + tail) > self.token_budget:
+            tail = tail[1:]
+
+        request = head + tail
+        self.last_token_count = estimate_tokens(request)
+        return request
@@ -0,0 +1,152 @@
+"""
+Timing runner used by estimate_complexity() in utils/piston_api.py. Started
+with `python -I`, so it must not import anything from this project.
+
+Reads one JSON request {"code", "target": {"name", "class"}, "params":
+[{"name", "kind"}], "sizes", "warmups", "repeats", "size_budget",
+"total_budget"} from stdin, calls the target on generated inputs of each size
+and writes a JSON list of {"n", "seconds"} (best per-call time) to stdout.
+"""
+import builtins
+import gc
+import io
+import json
+import math
+import os
+import random
+import signal
+import string
+import sys
+import time
+
+# Calls faster than this are looped so the timer resolution does not dominate
+MIN_TIMED_SECONDS = 0.005
+MAX_LOOPS = 100_000
+# Upper bound on input elements held in pre-made copies at once
+MAX_COPIED_ELEMENTS = 2_000_000
+
+
+class CallTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise CallTimeout()
+
+
+def _make_arg(kind, n, rng):
+    if kind == "int_list":
+        return [rng.randint(-10 * n, 10 * n) for _ in range(n)]
+    if kind == "sorted_int_list":
+        return sorted(rng.randint(-10 * n, 10 * n) for _ in range(n))
+    if kind == "str_list":
+        return ["".join(rng.choices(string.ascii_lowercase, k=5)) for _ in range(n)]
+    if kind == "matrix":
+        side = max(1, math.isqrt(n))
+        return [[rng.randint(0, 9) for _ in range(side)] for _ in range(side)]
+    if kind == "str":
+        return "".join(rng.choices(string.ascii_lowercase, k=n))
+    if kind == "size":
+        return n
+    if kind == "small_int":
+        return rng.randint(1, max(1, min(n, 10)))
+    if kind == "int":
+        # Outside the range of generated values, so searches hit their worst case
+        return 50 * n + 1
+    raise ValueError(f"Cannot generate inputs of kind {kind!r}")
+
+
+def _resolve(namespace, target):
+    if target.get("class"):
+        return getattr(namespace[target["class"]](), target["name"])
+    return namespace[target["name"]]
+
+
+def _copy(value):
+    if isinstance(value, list):
+        if value and isinstance(value[0], list):
+            return [row[:] for row in value]
+        return value[:]
+    return value
+
+
+def _time_size(func, params, n, request, rng):
+    base = [_make_arg(p["kind"], n, rng) for p in params]
+    trial_args = [_copy(a) for a in base]
+    start = time.perf_counter()
+    func(*trial_args)
+    trial = time.perf_counter() - start
+    # Functions that mutate their inputs get a fresh copy per call, made
+    # outside the timed region; the others can share one set of inputs.
+    mutates = trial_args != base
+    number = max(1, min(MAX_LOOPS, int(MIN_TIMED_SECONDS / max(trial, 1e-8))))
+    if mutates:
+        number = max(1, min(number, MAX_COPIED_ELEMENTS // n))
+
+    best = trial
+    for i in range(request["warmups"] + request["repeats"]):
+        if mutates:
+            args = [[_copy(a) for a in base] for _ in range(number)]
+        else:
+            args = [base] * number
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for a in args:
+                func(*a)
+            per_call = (time.perf_counter() - start) / number
+        finally:
+            gc.enable()
+        if i >= request["warmups"]:
+            best = min(best, per_call)
+        del args
+    return best, trial
+
+
+def main():
+    request = json.loads(sys.stdin.read())
+    real_stdout = os.fdopen(os.dup(1), "w")
+    devnull = open(os.devnull, "w")
+    os.dup2(devnull.fileno(), 1)
+    sys.stdin, sys.stdout, sys.stderr = io.StringIO(""), devnull, devnull
+
+    namespace = {"__name__": "__candidate__", "__builtins__": builtins}
+    try:
+        exec(compile(request["code"], "main.py", "exec"), namespace)
+    except Exception:
+        # Unguarded top-level code (e.g. reading stdin) fails here; functions
+        # defined before it are still usable.
+        pass
+
+    rng = random.Random(0)
+    timings = []
+    error = None
+    deadline = time.perf_counter() + request["total_budget"]
+    # A size whose calls blow far past the budget (e.g. exponential code at
+    # the next doubling) is abandoned instead of running into the outer timeout.
+    signal.signal(signal.SIGALRM, _on_alarm)
+    try:
+        func = _resolve(namespace, request["target"])
+        for n in request["sizes"]:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            signal.setitimer(signal.ITIMER_REAL, remaining)
+            seconds, trial = _time_size(func, request["params"], n, request, rng)
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            timings.append({"n": n, "seconds": seconds})
+            if trial > request["size_budget"]:
+                break
+    except CallTimeout:
+        error = f"exceeded the {request['total_budget']:.0f}s profiling budget"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    real_stdout.write(json.dumps({"timings": timings, "error": error}))
+    real_stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# One worker per core: every job runs at least one CPU-bound sandboxed process
+EXEC_WORKERS = int(os.getenv("EXEC_WORKERS", str(os.cpu_count() or 2)))
+# Jobs waiting (not running) across all users before new ones are rejected
+EXEC_QUEUE_DEPTH = int(os.getenv("EXEC_QUEUE_DEPTH", str(EXEC_WORKERS * 8)))
+# Jobs one user may have waiting behind their running one
+EXEC_MAX_QUEUED_PER_USER = int(os.getenv("EXEC_MAX_QUEUED_PER_USER", "2"))
+# Weight of the newest run time in the moving average used for wait estimates
+RUNTIME_EWMA_ALPHA = 0.2
+
+
+class Ticket:
+    """Handle for one submitted job; safe to poll from the Streamlit thread."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, scheduler, user, fn, args, kwargs):
+        self.id = next(self._ids)
+        self.user = user
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.state = "queued"
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._scheduler = scheduler
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def status(self):
+        """Queue position (0 = next to run), seconds waited and estimated wait."""
+        now = time.monotonic()
+        waited = (self.started_at or self.finished_at or now) - self.submitted_at
+        position = self._scheduler.position(self) if self.state == "queued" else 0
+        return {
+            "state": self.state,
+            "position": position,
+            "waited": waited,
+            "estimated_wait": self._scheduler.estimate_wait(position) if self.state == "queued" else 0.0,
+        }
+
+    def _finish(self, state, result=None, error=None):
+        self.state = state
+        self.result = result
+        self.error = error
+        self.finished_at = time.monotonic()
+        self._done.set()
+
+
+class ExecutionScheduler:
+    """
+    Central queue in front of all code execution in the process. A fixed pool
+    of worker threads serves users round-robin, each user has at most one job
+    running, and submissions beyond the queue limits are rejected at once
+    instead of piling up.
+
+    `workers` is also the process-wide budget of CPU slots: a running job
+    holds one, and may borrow idle ones for its own parallelism (see
+    borrow_slots). A borrowed slot keeps the next job from starting until it
+    is returned.
+    """
+
+    def __init__(self, workers=EXEC_WORKERS, max_queue=EXEC_QUEUE_DEPTH, max_per_user=EXEC_MAX_QUEUED_PER_USER):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        # user -> deque of waiting tickets; order of keys is the round-robin order
+        self._queues = OrderedDict()
+        self._running_users = set()
+        self._borrowed = 0
+        self._queued = 0
+        self._avg_runtime = 1.0
+        self._cond = threading.Condition()
+        self.completed = 0
+        self.rejected = 0
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"exec-worker-{i}", daemon=True).start()
+
+    def submit(self, user, fn, *args, **kwargs):
+        """Queues `fn(*args, **kwargs)` for `user`. Rejected tickets come back already done."""
+        return self._enqueue(Ticket(self, user, fn, args, kwargs), self.max_per_user)
+
+    def submit_background(self, user, fn, *args, **kwargs):
+        """
+        submit for jobs nobody is watching (e.g. measuring an answer for the
+        grader). They run in a lane of their own for `user`, one at a time,
+        so they neither wait behind nor count against the user's interactive
+        runs, and they are only rejected when the whole queue is full.
+        """
+        return self._enqueue(Ticket(self, (user, "background"), fn, args, kwargs), None)
+
+    def _enqueue(self, ticket, max_per_user):
+        with self._cond:
+            waiting = self._queues.get(ticket.user)
+            if self._queued >= self.max_queue:
+                error = "The code runner is at capacity. Please try again in a few seconds."
+            elif max_per_user is not None and waiting is not None and len(waiting) >= max_per_user:
+                error = "You already have runs waiting. Please wait for them to finish."
+            else:
+                error = None
+                self._queues.setdefault(ticket.user, deque()).append(ticket)
+                self._queued += 1
+                self._cond.notify()
+            if error:
+                self.rejected += 1
+        if error:
+            ticket._finish("rejected", error=error)
+        return ticket
+
+    def _next_ticket(self):
+        """Pops the first ticket of the first eligible user and rotates that user to the back."""
+        for user, waiting in self._queues.items():
+            if user in self._running_users:
+                continue
+            ticket = waiting.popleft()
+            if waiting:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            self._queued -= 1
+            return ticket
+        return None
+
+    def _free_slots(self):
+        return self.workers - len(self._running_users) - self._borrowed
+
+    def borrow_slots(self, wanted):
+        """
+        Extra CPU slots for a running job to fan out over; never waits. Only
+        slots no queued job could use are lent. Returns how many were granted;
+        give them back with return_slots.
+        """
+        with self._cond:
+            granted = max(0, min(wanted, self._free_slots() - self._queued))
+            self._borrowed += granted
+            return granted
+
+    def return_slots(self, count):
+        if not count:
+            return
+        with self._cond:
+            self._borrowed -= count
+            self._cond.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                ticket = self._next_ticket() if self._free_slots() > 0 else None
+                while ticket is None:
+                    self._cond.wait()
+                    ticket = self._next_ticket() if self._free_slots() > 0 else None
+                self._running_users.add(ticket.user)
+                ticket.state = "running"
+                ticket.started_at = time.monotonic()
+            try:
+                result, error = ticket.fn(*ticket.args, **ticket.kwargs), None
+            except Exception as e:
+                print(f"Execution job {ticket.id} failed: {e}")
+                result, error = None, f"Execution failed: {e}"
+            runtime = time.monotonic() - ticket.started_at
+            with self._cond:
+                self._running_users.discard(ticket.user)
+                self._avg_runtime += RUNTIME_EWMA_ALPHA * (runtime - self._avg_runtime)
+                self.completed += 1
+                # This user's next job may now be eligible
+                self._cond.notify_all()
+            ticket._finish("failed" if error else "done", result=result, error=error)
+
+    def position(self, ticket):
+        """
+        Number of queued jobs expected to start before `ticket` under
+        round-robin: every user ahead in the rotation gets one more turn than
+        the ones behind, up to the length of their queue.
+        """
+        with self._cond:
+            waiting = self._queues.get(ticket.user)
+            if waiting is None or ticket not in waiting:
+                return 0
+            rounds = list(waiting).index(ticket)
+            ahead = rounds
+            before_me = True
+            for user, other in self._queues.items():
+                if user == ticket.user:
+                    before_me = False
+                    continue
+                ahead += min(len(other), rounds + (1 if before_me else 0))
+            return ahead
+
+    def estimate_wait(self, position):
+        with self._cond:
+            busy = len(self._running_users)
+            avg = self._avg_runtime
+        # Jobs ahead drain `workers` at a time; add the wait for a free worker
+        free_slot = avg / 2 if busy >= self.workers else 0.0
+        return free_slot + (position // self.workers) * avg
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": len(self._running_users),
+                "borrowed": self._borrowed,
+                "queued": self._queued,
+                "users_waiting": len(self._queues),
+                "avg_runtime": self._avg_runtime,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_exec_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ExecutionScheduler()
+    return _scheduler
@@ -1,32 +1,568 @@
+import heapq
+import itertools
+import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils.llm_cache import cache_key, get_cache
+from utils.llm_metrics import get_metrics
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+# (connect, read) timeouts in seconds. Long feedback reports can take a while to
+# generate, so the read timeout is generous, but it is never unbounded.
+DEFAULT_TIMEOUT = (5, 60)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Completions at or below this temperature are close enough to deterministic
+# that they are cached unless the caller opts out with cache=False.
+CACHE_MAX_TEMPERATURE = 0.5
+
+# Process-wide request budgets shared by every Streamlit session
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+# Rough completion size assumed when reserving tokens; corrected after the call
+COMPLETION_TOKEN_ESTIMATE = 512
+MAX_QUEUE_WAIT = 60.0
+
+# Lower value is served first when the budgets are exhausted
+PRIORITIES = {"question": 0, "chat": 1, "background": 2}
+
+
+class GroqAPIError(Exception):
+    """Base class for every failure surfaced by the Groq client."""
+
+    def __init__(self, message, status_code=None, details=""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+        self.retries = 0
+
+
+class GroqConfigError(GroqAPIError):
+    """Raised when the client is missing configuration such as the API key."""
+
+
+class GroqTimeoutError(GroqAPIError):
+    """Raised when Groq did not answer within the connect/read timeouts."""
+
+
+class GroqRateLimitError(GroqAPIError):
+    """Raised when Groq keeps answering 429 after all retries are used up."""
+
+
+class GroqServerError(GroqAPIError):
+    """Raised for 5xx answers and dropped connections that survived retries."""
+
+
+class GroqResponseError(GroqAPIError):
+    """Raised for non-retryable 4xx answers and malformed response bodies."""
+
+
+class GroqCircuitOpenError(GroqAPIError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+@dataclass
+class ChatResult:
+    content: str
+    usage: dict = field(default_factory=dict)
+    latency: float = 0.0
+    retries: int = 0
+    cached: bool = False
+    queue_wait: float = 0.0
+    coalesced: bool = False
 
-def call_grok_api(messages, temperature=0.7):
-    """
-    Helper function to call Groq Cloud API (Llama3 model). 
-    """
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        raise Exception("GROQ_API_KEY not found in environment variables. Please check your .env file.")
-        
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "model": "llama-3.3-70b-versatile", 
-        "messages": messages,
-        "temperature": temperature
-    }
-    
+
+class GroqStream:
+    """
+    Iterable over the text deltas of a streamed completion (Server-Sent Events).
+    The request is only sent when iteration starts, so the object can be handed
+    straight to `st.write_stream`. Once exhausted, `content`, `usage`, `ttft`
+    (time to first token) and `latency` describe the whole call.
+    """
+
+    def __init__(self, client, payload, cache_key=None, cache_ttl=None, priority="chat", call_site="unlabeled"):
+        self._client = client
+        self._payload = payload
+        self._cache_key = cache_key
+        self._cache_ttl = cache_ttl
+        self._priority = priority
+        self._call_site = call_site
+        self._reserved = estimate_tokens(payload["messages"]) + COMPLETION_TOKEN_ESTIMATE
+        self.content = ""
+        self.usage = {}
+        self.ttft = None
+        self.latency = None
+        self.retries = 0
+        self.cached = False
+        self.queue_wait = 0.0
+
+    def __iter__(self):
+        try:
+            yield from self._iterate()
+        except GroqAPIError as e:
+            get_metrics().record(self._call_site, self._client.model, retries=e.retries or self.retries, error=e)
+            raise
+        get_metrics().record(self._call_site, self._client.model, usage=self.usage, latency=self.latency,
+                             ttft=self.ttft, retries=self.retries, queue_wait=self.queue_wait, cached=self.cached)
+
+    def _iterate(self):
+        start = time.perf_counter()
+        if self._cache_key:
+            hit = get_cache().get(self._cache_key)
+            if hit is not None:
+                self.content = hit
+                self.cached = True
+                self.ttft = self.latency = time.perf_counter() - start
+                yield hit
+                return
+
+        response, self.retries, self.queue_wait = self._client._post(
+            self._payload, stream=True, priority=self._priority, tokens=self._reserved)
+        parts = []
+        try:
+            # Raw bytes, decoded per line: SSE is always UTF-8, but requests
+            # would decode a text/event-stream without a charset as Latin-1
+            for raw in response.iter_lines():
+                line = raw.decode("utf-8", errors="replace")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError as e:
+                    raise GroqResponseError(f"Malformed stream event from the AI service: {e}", response.status_code, data)
+                # Groq reports usage on the final chunk under `x_groq`; OpenAI
+                # compatible servers use a top-level `usage` key.
+                usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+                if usage:
+                    self.usage = usage
+                for choice in chunk.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        if self.ttft is None:
+                            self.ttft = time.perf_counter() - start
+                        parts.append(delta)
+                        yield delta
+        except requests.Timeout as e:
+            raise GroqTimeoutError(f"The AI service stopped streaming: {e}")
+        except requests.RequestException as e:
+            raise GroqServerError(f"The AI service stream was interrupted: {e}")
+        finally:
+            response.close()
+            self.content = "".join(parts)
+            self.latency = time.perf_counter() - start
+            self._client.scheduler.settle(self._reserved, self.usage.get("total_tokens"))
+        if self._cache_key and self.content:
+            get_cache().set(self._cache_key, self.content, ttl=self._cache_ttl)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """False to reject, True to pass, "trial" when this call is the half-open trial."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return "trial"
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """Gives the half-open trial back when the call never reached the service (e.g. queue timeout)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+
+def _retry_after_seconds(response):
+    """Parses a numeric Retry-After header; HTTP-date values are ignored."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
     try:
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload)
-        response.raise_for_status()
-        
-        return response.json()['choices'][0]['message']['content']
-    except Exception as e:
-        error_details = ""
-        if 'response' in locals() and hasattr(response, 'text'):
-            error_details = response.text
-        return f"Error generating response from AI. Exception: {str(e)} | Details: {error_details}"
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def estimate_tokens(messages):
+    """
+    Cheap prompt size estimate (~4 characters per token plus per-message
+    framing). Good enough for budgeting without shipping a tokenizer.
+    """
+    return sum(len(m.get("content") or "") // 4 + 4 for m in messages)
+
+
+class TokenBucket:
+    """Continuously refilling budget of `capacity` units per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def seconds_until(self, amount):
+        self.refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+
+class RequestScheduler:
+    """
+    Admits requests against requests-per-minute and tokens-per-minute budgets.
+    Callers queue by priority class (see PRIORITIES) and then arrival order;
+    only the head of the queue may take from the buckets, so a burst of chat
+    traffic cannot starve live question generation.
+    """
+
+    def __init__(self, rpm=GROQ_RPM, tpm=GROQ_TPM, max_wait=MAX_QUEUE_WAIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_wait = max_wait
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens, priority="chat"):
+        """Blocks until the request may be sent; returns the time spent queued."""
+        start = time.monotonic()
+        ticket = (PRIORITIES.get(priority, PRIORITIES["chat"]), next(self._counter))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    waited = time.monotonic() - start
+                    if self._queue[0] == ticket:
+                        delay = max(self.requests.seconds_until(1), self.tokens.seconds_until(tokens))
+                        if delay == 0:
+                            self.requests.level -= 1
+                            self.tokens.level -= min(tokens, self.tokens.capacity)
+                            return waited
+                        give_up = waited + delay > self.max_wait
+                    else:
+                        # Woken up whenever the queue head changes
+                        delay = self.max_wait - waited
+                        give_up = delay <= 0
+                    if give_up:
+                        raise GroqRateLimitError(f"Request budget exhausted; gave up after queueing {waited:.1f}s.")
+                    self._cond.wait(delay)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def settle(self, reserved, actual):
+        """Corrects the token bucket once the real usage of a call is known."""
+        if not actual:
+            return
+        with self._cond:
+            self.tokens.refill()
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - actual)
+            self._cond.notify_all()
+
+
+class SingleFlight:
+    """Merges concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Returns `(result, shared)`; `shared` is True for merged callers."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class GroqClient:
+    """
+    Long-lived Groq Cloud client. One instance is shared by every Streamlit
+    session in the process so that TLS connections are pooled and kept alive.
+    """
+
+    def __init__(self, api_key=None, base_url=None, model=GROQ_MODEL,
+                 timeout=DEFAULT_TIMEOUT, max_retries=3, backoff_base=0.5,
+                 backoff_max=8.0, pool_size=10, breaker=None, scheduler=None):
+        self._api_key = api_key
+        # GROQ_API_URL may point at any OpenAI-compatible endpoint, e.g. the
+        # local stub in utils/llm_stub_server.py for offline benchmarking.
+        self.base_url = base_url or os.getenv("GROQ_API_URL", GROQ_API_URL)
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.scheduler = scheduler or RequestScheduler()
+        self._single_flight = SingleFlight()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def api_key(self):
+        # Read lazily so that load_dotenv() in app.py may run after import.
+        return self._api_key or os.getenv("GROQ_API_KEY")
+
+    def _headers(self):
+        api_key = self.api_key
+        if not api_key and self.base_url != GROQ_API_URL:
+            # Local stand-in servers do not check credentials
+            api_key = "offline"
+        if not api_key:
+            raise GroqConfigError("GROQ_API_KEY not found in environment variables. Please check your .env file.")
+        return {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _backoff(self, attempt, response=None):
+        retry_after = _retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: sleep a random amount up to the exponential ceiling.
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _post(self, payload, stream=False, priority="chat", tokens=COMPLETION_TOKEN_ESTIMATE):
+        """
+        Sends one request with retries. Every attempt is admitted by the
+        scheduler first. Returns `(response, retries, queue_wait)` for a 2xx
+        answer or raises a GroqAPIError subclass.
+        """
+        headers = self._headers()
+        admitted = self.breaker.allow()
+        if not admitted:
+            raise GroqCircuitOpenError("The AI service is temporarily unavailable after repeated failures. Please try again shortly.")
+
+        try:
+            return self._post_attempts(headers, payload, stream, priority, tokens)
+        except BaseException:
+            # A trial that ended without recording an outcome (e.g. the
+            # scheduler gave up queueing) must not leave the breaker half-open
+            # forever
+            if admitted == "trial":
+                self.breaker.release()
+            raise
+
+    def _post_attempts(self, headers, payload, stream, priority, tokens):
+        attempt = 0
+        queue_wait = 0.0
+        while True:
+            response = None
+            queue_wait += self.scheduler.acquire(tokens, priority)
+            try:
+                response = self.session.post(self.base_url, headers=headers, json=payload,
+                                             timeout=self.timeout, stream=stream)
+            except requests.Timeout as e:
+                error = GroqTimeoutError(f"The AI service did not respond in time: {e}")
+            except requests.ConnectionError as e:
+                error = GroqServerError(f"Could not connect to the AI service: {e}")
+            except requests.RequestException as e:
+                # Invalid URL, too many redirects, broken chunked encoding, ...
+                error = GroqServerError(f"The request to the AI service failed: {e}")
+            else:
+                if response.status_code < 400:
+                    self.breaker.record_success()
+                    return response, attempt, queue_wait
+                details = response.text
+                if response.status_code == 429:
+                    error = GroqRateLimitError("The AI service is rate limiting requests.", response.status_code, details)
+                elif response.status_code >= 500:
+                    error = GroqServerError(f"The AI service returned {response.status_code}.", response.status_code, details)
+                else:
+                    # Bad request / auth problems will not fix themselves. The
+                    # service itself answered, so it counts as healthy.
+                    self.breaker.record_success()
+                    raise GroqResponseError(f"The AI service rejected the request ({response.status_code}).", response.status_code, details)
+
+            retryable = response is None or response.status_code in RETRY_STATUS_CODES
+            if not retryable or attempt >= self.max_retries:
+                self.breaker.record_failure()
+                error.retries = attempt
+                raise error
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def _cache_key(self, messages, temperature, cache):
+        """
+        cache=None caches low-temperature calls only; True/False force the
+        choice for this call.
+        """
+        if cache is None:
+            cache = temperature <= CACHE_MAX_TEMPERATURE
+        return cache_key(self.model, messages, temperature) if cache else None
+
+    def _send_chat(self, payload, priority):
+        reserved = estimate_tokens(payload["messages"]) + COMPLETION_TOKEN_ESTIMATE
+        start = time.perf_counter()
+        response, retries, queue_wait = self._post(payload, priority=priority, tokens=reserved)
+        try:
+            body = response.json()
+            content = body['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise GroqResponseError(f"Unexpected response from the AI service: {e}", response.status_code, response.text)
+        usage = body.get("usage") or {}
+        self.scheduler.settle(reserved, usage.get("total_tokens"))
+        return ChatResult(
+            content=content,
+            usage=usage,
+            latency=time.perf_counter() - start,
+            retries=retries,
+            queue_wait=queue_wait
+        )
+
+    def chat(self, messages, temperature=0.7, cache=None, ttl=None, priority="chat", call_site="unlabeled"):
+        """Non-streaming completion; the call is recorded under `call_site` in the LLM metrics."""
+        try:
+            result = self._chat(messages, temperature, cache, ttl, priority)
+        except GroqAPIError as e:
+            get_metrics().record(call_site, self.model, retries=e.retries, error=e)
+            raise
+        # Without streaming the first token arrives together with the last one
+        get_metrics().record(call_site, self.model, usage=result.usage, latency=result.latency,
+                             ttft=result.latency, retries=result.retries, queue_wait=result.queue_wait,
+                             cached=result.cached or result.coalesced)
+        return result
+
+    def _chat(self, messages, temperature, cache, ttl, priority):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature
+        }
+        start = time.perf_counter()
+        key = self._cache_key(messages, temperature, cache)
+        if not key:
+            return self._send_chat(payload, priority)
+
+        hit = get_cache().get(key)
+        if hit is not None:
+            return ChatResult(content=hit, latency=time.perf_counter() - start, cached=True)
+        # Requests that would share a cache entry anyway are also merged while
+        # in flight, so a cohort hitting the same prompt costs one upstream call.
+        result, shared = self._single_flight.do(key, lambda: self._send_chat(payload, priority))
+        if shared:
+            return ChatResult(content=result.content, latency=time.perf_counter() - start, coalesced=True)
+        get_cache().set(key, result.content, ttl=ttl)
+        return result
+
+    def stream(self, messages, temperature=0.7, cache=None, ttl=None, priority="chat", call_site="unlabeled"):
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True
+        }
+        return GroqStream(self, payload, cache_key=self._cache_key(messages, temperature, cache),
+                          cache_ttl=ttl, priority=priority, call_site=call_site)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GroqClient()
+    return _client
+
+
+def call_grok_api(messages, temperature=0.7, cache=None, ttl=None, priority="chat", call_site="unlabeled"):
+    """
+    Helper function to call Groq Cloud API (Llama3 model).
+    Responses are served from the LLM cache when `cache` allows it (see
+    GroqClient._cache_key); `ttl` overrides the default expiry in seconds.
+    `priority` is one of PRIORITIES and decides the queue order when the
+    process-wide request budget is exhausted. `call_site` labels the call in
+    utils/llm_metrics.py (tech_question, hr_question, feedback, chat, ...).
+    Raises a GroqAPIError subclass on failure.
+    """
+    return get_client().chat(messages, temperature=temperature, cache=cache, ttl=ttl,
+                             priority=priority, call_site=call_site).content
+
+
+def stream_grok_api(messages, temperature=0.7, cache=None, ttl=None, priority="chat", call_site="unlabeled"):
+    """
+    Streaming variant of call_grok_api. Returns a GroqStream that yields text
+    deltas as they arrive and records time-to-first-token and total latency.
+    A cache hit is yielded as a single chunk.
+    """
+    return get_client().stream(messages, temperature=temperature, cache=cache, ttl=ttl,
+                               priority=priority, call_site=call_site)
@@ -0,0 +1,144 @@
+"""
+Batch test runner used by utils/test_harness.py. Started with `python -I`,
+so it must not import anything from this project.
+
+Reads one JSON request {"code", "cases": [{"index", "input"}], "timeout",
+"cpu_seconds", "max_output"} from stdin, compiles the code once and runs
+every case in a forked child of this already-warm interpreter. Writes a JSON
+list of per-case results to stdout.
+"""
+import builtins
+import io
+import json
+import os
+import resource
+import signal
+import sys
+import time
+import traceback
+
+
+class OutputLimitExceeded(BaseException):
+    pass
+
+
+class _CappedBytesIO(io.BytesIO):
+    """BytesIO that stops the candidate's code once it has written `limit` bytes."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.written = 0
+
+    def write(self, b):
+        self.written += memoryview(b).nbytes
+        if self.written > self.limit:
+            raise OutputLimitExceeded()
+        return super().write(b)
+
+
+class _CappedIO(io.TextIOWrapper):
+    """Text stream over a _CappedBytesIO, so text and sys.stdout.buffer writes share the cap."""
+
+    def __init__(self, limit):
+        super().__init__(_CappedBytesIO(limit), encoding="utf-8", errors="replace", write_through=True)
+
+    def getvalue(self):
+        try:
+            self.flush()
+        except OutputLimitExceeded:
+            pass
+        return self.buffer.getvalue().decode("utf-8", errors="replace")
+
+
+def _run_case(compiled, stdin, max_output):
+    stdout, stderr = _CappedIO(max_output), _CappedIO(max_output)
+    # Byte-backed like the real stdin, so sys.stdin.buffer.read() works too
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin.encode("utf-8")), encoding="utf-8")
+    sys.stdout, sys.stderr = stdout, stderr
+    exit_code = 0
+    try:
+        exec(compiled, {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except OutputLimitExceeded:
+        return {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "code": 1,
+                "error": f"Output limit of {max_output} bytes exceeded"}
+    except BaseException:
+        etype, value, tb = sys.exc_info()
+        try:
+            traceback.print_exception(etype, value, tb.tb_next or tb, file=stderr)
+        except OutputLimitExceeded:
+            pass
+        exit_code = 1
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "code": exit_code,
+    }
+
+
+def _fork_case(compiled, case, timeout, cpu_seconds, max_output):
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            signal.alarm(max(1, int(timeout)))
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            payload = json.dumps(_run_case(compiled, case.get("input", ""), max_output)).encode("utf-8")
+            with os.fdopen(write_fd, "wb") as pipe:
+                pipe.write(payload)
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        payload = pipe.read()
+    _, status, rusage = os.wait4(pid, 0)
+    wall_time = time.perf_counter() - start
+
+    if os.WIFSIGNALED(status) or not payload:
+        signum = os.WTERMSIG(status) if os.WIFSIGNALED(status) else 0
+        if signum == signal.SIGALRM:
+            error = f"Timed out ({timeout}s limit)"
+        elif signum == signal.SIGXCPU:
+            error = "CPU time limit exceeded"
+        else:
+            error = f"Killed by signal {signum}" if signum else "Crashed without a result"
+        result = {"stdout": "", "stderr": "", "code": -signum, "error": error}
+    else:
+        result = json.loads(payload)
+    result["index"] = case["index"]
+    result["wall_time"] = wall_time
+    # Linux reports ru_maxrss in KiB
+    result["peak_rss_kb"] = rusage.ru_maxrss
+    return result
+
+
+def main():
+    request = json.loads(sys.stdin.read())
+    # Keep the result channel away from fd 1 so raw writes by candidate code
+    # (os.write, C extensions) cannot corrupt it.
+    real_stdout = os.fdopen(os.dup(1), "w")
+    devnull = open(os.devnull, "w")
+    os.dup2(devnull.fileno(), 1)
+    try:
+        compiled = compile(request["code"], "main.py", "exec")
+    except SyntaxError:
+        error = traceback.format_exc(limit=0)
+        results = [{"index": c["index"], "stdout": "", "stderr": error, "code": 1,
+                    "wall_time": 0.0, "peak_rss_kb": 0} for c in request["cases"]]
+    else:
+        sys.stderr = devnull
+        results = [
+            _fork_case(compiled, case, request["timeout"], request["cpu_seconds"], request["max_output"])
+            for case in request["cases"]
+        ]
+    real_stdout.write(json.dumps(results))
+    real_stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
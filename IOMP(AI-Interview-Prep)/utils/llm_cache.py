@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def cache_key(model, messages, temperature):
+    """Content address of a chat completion request."""
+    raw = json.dumps({"model": model, "messages": messages, "temperature": temperature},
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-level response cache: a bounded in-memory LRU in front of a SQLite
+    file, so entries survive Streamlit restarts. Every entry carries its own
+    expiry time. Pass `path=None` to keep the cache in memory only.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=256, default_ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            try:
+                self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"LLM cache persistence disabled: {e}")
+                self._db = None
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"LLM cache read failed: {e}")
+                    row = None
+                if row is not None and row[1] > now:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at)
+                    )
+                    self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"LLM cache write failed: {e}")
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._memory)
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
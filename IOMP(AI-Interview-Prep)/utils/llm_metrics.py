@@ -0,0 +1,163 @@
+import json
+import threading
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# USD per million (input, output) tokens
+MODEL_PRICING = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            yield bound, total
+
+    def snapshot(self):
+        return {
+            "buckets": {str(bound): count for bound, count in self.cumulative()},
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class CallSiteStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.ttft = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.completion_size = Histogram(TOKEN_BUCKETS)
+
+
+class LLMMetrics:
+    """
+    In-process aggregation of per-call LLM telemetry, labelled by call site
+    (tech_question, hr_question, feedback, chat, ...).
+    """
+
+    def __init__(self):
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def record(self, call_site, model, usage=None, latency=None, ttft=None, retries=0,
+               queue_wait=0.0, cached=False, error=None):
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        with self._lock:
+            stats = self._sites.setdefault(call_site, CallSiteStats())
+            stats.calls += 1
+            stats.retries += retries
+            if error is not None:
+                stats.errors += 1
+                return
+            if cached:
+                stats.cache_hits += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost_usd += call_cost(model, prompt_tokens, completion_tokens)
+            if latency is not None:
+                stats.latency.observe(latency)
+            if ttft is not None:
+                stats.ttft.observe(ttft)
+            stats.queue_wait.observe(queue_wait or 0.0)
+            if completion_tokens:
+                stats.completion_size.observe(completion_tokens)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                site: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "cache_hits": s.cache_hits,
+                    "retries": s.retries,
+                    "prompt_tokens": s.prompt_tokens,
+                    "completion_tokens": s.completion_tokens,
+                    "cost_usd": round(s.cost_usd, 6),
+                    "latency_seconds": s.latency.snapshot(),
+                    "ttft_seconds": s.ttft.snapshot(),
+                    "queue_wait_seconds": s.queue_wait.snapshot(),
+                    "completion_tokens_histogram": s.completion_size.snapshot(),
+                }
+                for site, s in self._sites.items()
+            }
+
+    def snapshot_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def export_prometheus(self):
+        counters = [
+            ("llm_calls_total", "LLM calls", "calls"),
+            ("llm_errors_total", "LLM calls that raised", "errors"),
+            ("llm_cache_hits_total", "LLM calls served from the response cache", "cache_hits"),
+            ("llm_retries_total", "Upstream retries", "retries"),
+            ("llm_prompt_tokens_total", "Prompt tokens", "prompt_tokens"),
+            ("llm_completion_tokens_total", "Completion tokens", "completion_tokens"),
+            ("llm_cost_usd_total", "Estimated spend in USD", "cost_usd"),
+        ]
+        histograms = [
+            ("llm_latency_seconds", "Total call latency", "latency"),
+            ("llm_ttft_seconds", "Time to first token", "ttft"),
+            ("llm_queue_wait_seconds", "Time queued by the request scheduler", "queue_wait"),
+            ("llm_completion_tokens", "Completion size per call", "completion_size"),
+        ]
+        lines = []
+        with self._lock:
+            sites = sorted(self._sites.items())
+            for name, help_text, attr in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for site, stats in sites:
+                    lines.append(f'{name}{{call_site="{site}"}} {getattr(stats, attr)}')
+            for name, help_text, attr in histograms:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for site, stats in sites:
+                    histogram = getattr(stats, attr)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{call_site="{site}",le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{call_site="{site}"}} {histogram.sum}')
+                    lines.append(f'{name}_count{{call_site="{site}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = LLMMetrics()
+
+
+def get_metrics():
+    return _metrics
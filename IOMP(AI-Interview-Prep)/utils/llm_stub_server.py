@@ -0,0 +1,234 @@
+"""
+OpenAI-compatible stand-in for the Groq chat completions endpoint.
+
+Point the app at it with
+    GROQ_API_URL=http://127.0.0.1:8765/openai/v1/chat/completions
+and run
+    python -m utils.llm_stub_server --profile groq --mode synthetic
+
+Modes:
+    synthetic  deterministic text derived from a hash of the request
+    record     forwards to the real Groq API (needs GROQ_API_KEY) and saves
+               every answer as a fixture file
+    replay     serves answers from fixture files only (falls back to
+               synthetic text for unknown requests unless --strict)
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from utils.grok_api import GROQ_API_URL, estimate_tokens
+from utils.llm_cache import cache_key
+
+# Seconds to first token and tokens per second after that
+LATENCY_PROFILES = {
+    "instant": {"ttft": 0.0, "tokens_per_sec": None},
+    "groq": {"ttft": 0.3, "tokens_per_sec": 250},
+    "slow": {"ttft": 1.5, "tokens_per_sec": 30},
+}
+
+DEFAULT_FIXTURE_DIR = os.path.join("fixtures", "llm")
+
+_WORDS = (
+    "candidate solution approach complexity array string tree graph dynamic programming "
+    "hash map pointer window binary search recursion edge case trade off design scale "
+    "latency cache queue stakeholder conflict deadline ownership impact metric feedback"
+).split()
+
+
+def synthetic_completion(key, completion_tokens):
+    rng = random.Random(key)
+    return " ".join(rng.choice(_WORDS) for _ in range(completion_tokens)).capitalize() + "."
+
+
+def split_tokens(text):
+    """Splits text into word-sized chunks that re-join to the original text."""
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+class StubBackend:
+    def __init__(self, mode="synthetic", profile="groq", fixture_dir=DEFAULT_FIXTURE_DIR,
+                 completion_tokens=120, strict=False, upstream_url=GROQ_API_URL):
+        self.mode = mode
+        self.profile = dict(LATENCY_PROFILES[profile]) if isinstance(profile, str) else dict(profile)
+        self.fixture_dir = fixture_dir
+        self.completion_tokens = completion_tokens
+        self.strict = strict
+        self.upstream_url = upstream_url
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        if mode == "record":
+            os.makedirs(fixture_dir, exist_ok=True)
+
+    def _fixture_path(self, key):
+        return os.path.join(self.fixture_dir, f"{key}.json")
+
+    def _record(self, key, body):
+        upstream = dict(body, stream=False)
+        response = self._session.post(
+            self.upstream_url, json=upstream, timeout=(5, 120),
+            headers={"Authorization": f"Bearer {os.getenv('GROQ_API_KEY', '')}"}
+        )
+        response.raise_for_status()
+        data = response.json()
+        fixture = {
+            "request": {k: body.get(k) for k in ("model", "messages", "temperature")},
+            "content": data["choices"][0]["message"]["content"],
+            "usage": data.get("usage") or {}
+        }
+        with self._lock, open(self._fixture_path(key), "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=2, ensure_ascii=False)
+        return fixture["content"]
+
+    def complete(self, body):
+        """Returns the completion text for a request body, or None if unknown."""
+        key = cache_key(body.get("model"), body.get("messages"), body.get("temperature", 1.0))
+        if self.mode == "record":
+            return self._record(key, body)
+        if self.mode == "replay":
+            try:
+                with open(self._fixture_path(key), encoding="utf-8") as f:
+                    return json.load(f)["content"]
+            except FileNotFoundError:
+                if self.strict:
+                    return None
+        return synthetic_completion(key, self.completion_tokens)
+
+    def token_delay(self):
+        tps = self.profile.get("tokens_per_sec")
+        return 1.0 / tps if tps else 0.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without TCP_NODELAY the
+    # client's delayed ACK adds ~40ms to every request and skews benchmarks.
+    disable_nagle_algorithm = True
+    backend = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        try:
+            content = self.backend.complete(body)
+        except requests.RequestException as e:
+            self._send_json(502, {"error": {"message": f"Upstream recording failed: {e}"}})
+            return
+        if content is None:
+            self._send_json(404, {"error": {"message": "No fixture recorded for this request"}})
+            return
+
+        tokens = split_tokens(content)
+        usage = {
+            "prompt_tokens": estimate_tokens(body.get("messages") or []),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = "chatcmpl-stub-" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        time.sleep(self.backend.profile.get("ttft") or 0)
+        delay = self.backend.token_delay()
+
+        if not body.get("stream"):
+            time.sleep(delay * len(tokens))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(delay)
+            chunk = {"id": completion_id, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            # Unescaped UTF-8 like the real API, so clients must decode it properly
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+        final = {"id": completion_id, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                 "x_groq": {"usage": usage}}
+        self._write_chunk(f"data: {json.dumps(final)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_stub_server(backend=None, host="127.0.0.1", port=0):
+    """
+    Starts the stub on a daemon thread and returns the server. Its chat
+    completions URL is `server.url`.
+    """
+    handler = type("BoundStubHandler", (StubHandler,), {"backend": backend or StubBackend()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.url = f"http://{host}:{server.server_port}/openai/v1/chat/completions"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mode", choices=["synthetic", "record", "replay"], default="synthetic")
+    parser.add_argument("--profile", choices=sorted(LATENCY_PROFILES), default="groq")
+    parser.add_argument("--ttft", type=float, help="Override the profile's time to first token (seconds)")
+    parser.add_argument("--tokens-per-sec", type=float, help="Override the profile's token rate")
+    parser.add_argument("--completion-tokens", type=int, default=120, help="Length of synthetic answers")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--strict", action="store_true", help="In replay mode, 404 on unknown requests")
+    args = parser.parse_args()
+
+    profile = dict(LATENCY_PROFILES[args.profile])
+    if args.ttft is not None:
+        profile["ttft"] = args.ttft
+    if args.tokens_per_sec is not None:
+        profile["tokens_per_sec"] = args.tokens_per_sec or None
+    backend = StubBackend(mode=args.mode, profile=profile, fixture_dir=args.fixtures,
+                          completion_tokens=args.completion_tokens, strict=args.strict)
+
+    handler = type("BoundStubHandler", (StubHandler,), {"backend": backend})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"LLM stub ({args.mode}, {args.profile}) listening on "
+          f"http://{args.host}:{args.port}/openai/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from utils.sandbox import run_sandboxed, WALL_TIMEOUT_SECONDS
+
+ARTIFACT_CACHE_DIR = os.getenv(
+    "CODE_ARTIFACT_CACHE", os.path.join(tempfile.gettempdir(), "interview-coach-artifacts")
+)
+MAX_CACHED_ARTIFACTS = int(os.getenv("CODE_ARTIFACT_CACHE_ENTRIES", "200"))
+COMPILE_TIMEOUT_SECONDS = 30
+
+# How to build and run each editor language with a local toolchain. Commands
+# are formatted with {src} (source path), {out} (artifact dir) and {main}
+# (Java main class). JVM and V8 reserve far more address space than they use,
+# so they are capped with their own heap flags instead of RLIMIT_AS.
+TOOLCHAINS = {
+    "c": {
+        "source": "main.c",
+        "requires": ["gcc"],
+        "version": ["gcc", "--version"],
+        "compile": ["gcc", "-O2", "-std=c11", "-o", "{out}/main", "{src}", "-lm"],
+        "run": ["{out}/main"],
+        "memory_mb": 512,
+    },
+    "c_cpp": {
+        "source": "main.cpp",
+        "requires": ["g++"],
+        "version": ["g++", "--version"],
+        "compile": ["g++", "-O2", "-std=c++17", "-o", "{out}/main", "{src}"],
+        "run": ["{out}/main"],
+        "memory_mb": 512,
+    },
+    "java": {
+        "source": "{main}.java",
+        "requires": ["javac", "java"],
+        "version": ["javac", "-version"],
+        "compile": ["javac", "-d", "{out}", "{src}"],
+        "run": ["java", "-Xmx256m", "-Xss64m", "-cp", "{out}", "{main}"],
+        "memory_mb": None,
+    },
+    "javascript": {
+        "source": "main.js",
+        "requires": ["node"],
+        "version": ["node", "--version"],
+        "compile": None,
+        "run": ["node", "--max-old-space-size=256", "{src}"],
+        "memory_mb": None,
+    },
+    "csharp": {
+        "source": "main.cs",
+        "requires": ["mcs", "mono"],
+        "version": ["mcs", "--version"],
+        "compile": ["mcs", "-optimize+", "-out:{out}/main.exe", "{src}"],
+        "run": ["mono", "{out}/main.exe"],
+        "memory_mb": None,
+    },
+}
+
+_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def toolchain_version(language):
+    """First line of the compiler/runtime version banner, or None if missing."""
+    spec = TOOLCHAINS.get(language)
+    if not spec:
+        return None
+    if not all(shutil.which(binary) for binary in spec["requires"]):
+        return None
+    try:
+        result = subprocess.run(spec["version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    banner = (result.stdout or result.stderr).strip().splitlines()
+    return banner[0] if banner else spec["version"][0]
+
+
+def is_available(language):
+    return toolchain_version(language) is not None
+
+
+def java_main_class(code):
+    match = re.search(r"public\s+(?:final\s+)?class\s+(\w+)", code)
+    return match.group(1) if match else "Main"
+
+
+def artifact_key(language, code):
+    raw = f"{language}\0{toolchain_version(language)}\0{code}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _fmt(args, **values):
+    return [a.format(**values) for a in args]
+
+
+def _prune_cache():
+    try:
+        entries = [os.path.join(ARTIFACT_CACHE_DIR, e) for e in os.listdir(ARTIFACT_CACHE_DIR)]
+    except FileNotFoundError:
+        return
+    entries = [e for e in entries if os.path.isdir(e) and not os.path.basename(e).startswith(".")]
+    if len(entries) <= MAX_CACHED_ARTIFACTS:
+        return
+    entries.sort(key=os.path.getmtime)
+    for stale in entries[:len(entries) - MAX_CACHED_ARTIFACTS]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def build(language, code):
+    """
+    Returns `(artifact_dir, compile_error_result)`. Compiled artifacts are
+    cached under (language, toolchain version, source hash), so running
+    unchanged code again skips the compiler entirely.
+    """
+    spec = TOOLCHAINS[language]
+    main = java_main_class(code) if language == "java" else "main"
+    artifact_dir = os.path.join(ARTIFACT_CACHE_DIR, artifact_key(language, code))
+    if os.path.isdir(artifact_dir):
+        os.utime(artifact_dir)
+        return artifact_dir, None
+
+    os.makedirs(ARTIFACT_CACHE_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".build-", dir=ARTIFACT_CACHE_DIR)
+    source_name = spec["source"].format(main=main)
+    with open(os.path.join(staging, source_name), "w", encoding="utf-8") as f:
+        f.write(code)
+
+    if spec["compile"]:
+        # Relative paths keep the staging directory out of compiler messages
+        result = run_sandboxed(
+            _fmt(spec["compile"], src=source_name, out=".", main=main),
+            cwd=staging, timeout=COMPILE_TIMEOUT_SECONDS, memory_mb=None, cpu_seconds=COMPILE_TIMEOUT_SECONDS
+        )
+        if "error" in result or result["code"] != 0:
+            shutil.rmtree(staging, ignore_errors=True)
+            if "error" in result:
+                return None, {"error": "Compilation timed out."}
+            return None, result
+
+    with _cache_lock:
+        try:
+            os.rename(staging, artifact_dir)
+        except OSError:
+            # Another session built the same source concurrently; use theirs
+            shutil.rmtree(staging, ignore_errors=True)
+        _prune_cache()
+    return artifact_dir, None
+
+
+def run_command(language, code, artifact_dir):
+    spec = TOOLCHAINS[language]
+    main = java_main_class(code) if language == "java" else "main"
+    src = os.path.join(artifact_dir, spec["source"].format(main=main))
+    return _fmt(spec["run"], src=src, out=artifact_dir, main=main)
+
+
+def execute_locally(language, code, stdin="", timeout=WALL_TIMEOUT_SECONDS, on_output=None):
+    """Builds (or reuses) the artifact for `code` and runs it in a sandboxed subprocess."""
+    artifact_dir, compile_error = build(language, code)
+    if compile_error:
+        return compile_error
+    workdir = tempfile.mkdtemp(prefix="run-")
+    try:
+        return run_sandboxed(
+            run_command(language, code, artifact_dir), stdin=stdin, cwd=workdir,
+            timeout=timeout, memory_mb=TOOLCHAINS[language]["memory_mb"], on_output=on_output
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
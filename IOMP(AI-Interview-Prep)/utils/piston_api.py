@@ -1,12 +1,28 @@
-import requests
-import subprocess
 import sys
 import tempfile
 import os
+import ast
+import hashlib
+import json
+import math
+import re
+import shutil
+import subprocess
+import threading
+import traceback
+from collections import OrderedDict
+from utils.sandbox import run_sandboxed
+from utils.sandbox_pool import get_python_pool
+from utils import local_runner
+from utils.piston_client import get_piston_client, PistonUnavailable
 
-# Piston API endpoint - Official public instance discontinued Feb 2026.
-# Users can provide their own instance URL in .env as PISTON_INSTANCE_URL
-PISTON_API_URL = os.getenv("PISTON_INSTANCE_URL", "https://emkc.org/api/v2/piston/execute")
+# Piston API endpoints - Official public instance discontinued Feb 2026.
+# Users can provide their own instances in .env as PISTON_INSTANCE_URLS
+# (comma-separated) or a single PISTON_INSTANCE_URL; see utils/piston_client.py.
+
+# "auto" runs a language locally when its toolchain is installed and uses
+# Piston otherwise; "local" / "piston" force one backend.
+EXECUTION_BACKEND = os.getenv("CODE_EXECUTION_BACKEND", "auto")
 
 # Map of common languages to Piston runtime identifiers
 LANGUAGE_MAP = {
@@ -18,15 +34,282 @@ LANGUAGE_MAP = {
     "c": {"language": "c", "version": "10.2.0"}
 }
 
-def execute_code(language, code):
+# Upper bound on the total size of cached execution results
+EXEC_CACHE_MAX_BYTES = int(os.getenv("EXEC_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Source patterns whose output may differ between runs of identical code:
+# randomness, clocks, identity-based hashing and unordered iteration.
+NONDETERMINISM_MARKERS = {
+    "python": [r"\brandom\b", r"\btime\b", r"\bdatetime\b", r"\buuid\b", r"\bsecrets\b",
+               r"\burandom\b", r"\bhash\(", r"\bid\(", r"\bset\(", r"\bthreading\b", r"\bmultiprocessing\b"],
+    "javascript": [r"Math\.random", r"\bDate\b", r"performance\.now", r"\bcrypto\b", r"setTimeout|setInterval"],
+    "c": [r"\brand\(", r"\bsrand\b", r"\btime\(", r"\bclock\(", r"\bpthread", r"%p"],
+    "c_cpp": [r"\brand\(", r"\bsrand\b", r"\btime\(", r"\bclock\(", r"random_device|mt19937|<random>",
+              r"\bchrono\b", r"\bthread\b", r"unordered_", r"%p"],
+    "java": [r"\bRandom\b", r"Math\.random", r"currentTimeMillis|nanoTime", r"\bUUID\b", r"\bThread\b",
+             r"LocalDate|LocalTime|Instant|new Date", r"hashCode\(\)"],
+    "csharp": [r"\bRandom\b", r"DateTime|Stopwatch", r"\bGuid\b", r"\bThread\b|\bTask\b", r"GetHashCode"],
+}
+
+
+class ExecutionCache:
+    """
+    LRU cache of execution results bounded by the total bytes of output it
+    holds. Only deterministic, completed runs are stored.
+    """
+
+    def __init__(self, max_bytes=EXEC_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _entry_size(key, result):
+        return len(key) + sum(len(result.get(k, "").encode("utf-8")) for k in ("stdout", "stderr", "output"))
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        size = self._entry_size(key, result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= self._entry_size(key, old)
+            self._entries[key] = result
+            self._size += size
+            while self._size > self.max_bytes:
+                old_key, old_result = self._entries.popitem(last=False)
+                self._size -= self._entry_size(old_key, old_result)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+_result_cache = ExecutionCache()
+
+
+def get_execution_cache():
+    return _result_cache
+
+
+def _select_backend(language):
+    """Returns "python", "local", "piston", or an error result dict."""
+    if language == "python":
+        return "python"
+    if EXECUTION_BACKEND != "piston" and language in local_runner.TOOLCHAINS:
+        if local_runner.is_available(language):
+            return "local"
+        if EXECUTION_BACKEND == "local":
+            return {"error": f"No local toolchain found for '{language}'. Install it or set CODE_EXECUTION_BACKEND=piston."}
+    return "piston"
+
+
+def runtime_version(language, backend):
+    if backend == "python":
+        return sys.version
+    if backend == "local":
+        return local_runner.toolchain_version(language)
+    return f"piston {LANGUAGE_MAP.get(language, {}).get('version')}"
+
+
+def is_deterministic(language, code):
+    return not any(re.search(marker, code) for marker in NONDETERMINISM_MARKERS.get(language, []))
+
+
+def execution_cache_key(language, code, stdin, backend):
+    """Cache key for a run, or None if the code looks nondeterministic."""
+    if not is_deterministic(language, code):
+        return None
+    raw = "\0".join([language, runtime_version(language, backend) or "", hashlib.sha256(code.encode("utf-8")).hexdigest(), stdin])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _is_cacheable(result):
+    # Timeouts and API failures come back as {"error"}; signal kills (rlimits,
+    # output cap) depend on load as much as on the code
+    code = result.get("code")
+    return "error" not in result and isinstance(code, int) and code >= 0 and "Killed" not in result.get("stderr", "")
+
+
+# --- Static pre-check ----------------------------------------------------------
+
+# Modules candidate code may not import: they reach outside the sandbox
+DISALLOWED_IMPORTS = {"os", "subprocess", "socket"}
+
+# Syntax-only checks for languages that would otherwise make a Piston round
+# trip; the source is passed on stdin or as a file named {src}
+SYNTAX_CHECKERS = {
+    "c": {"source": "main.c", "cmd": ["gcc", "-fsyntax-only", "-std=c11", "{src}"]},
+    "c_cpp": {"source": "main.cpp", "cmd": ["g++", "-fsyntax-only", "-std=c++17", "{src}"]},
+    "javascript": {"source": "main.js", "cmd": ["node", "--check", "{src}"]},
+}
+SYNTAX_CHECK_TIMEOUT_SECONDS = 5
+
+
+def _precheck_failure(message):
+    return {"stdout": "", "stderr": message, "output": message, "code": 1, "precheck": True}
+
+
+class _PrecheckVisitor(ast.NodeVisitor):
+    """Collects disallowed imports and `while True` loops that can never exit."""
+
+    def __init__(self):
+        self.problems = []
+
+    def _check_module(self, node, module):
+        root = (module or "").split(".")[0]
+        if root in DISALLOWED_IMPORTS:
+            self.problems.append(f"line {node.lineno}: importing '{root}' is not allowed in the sandbox")
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._check_module(node, alias.name)
+
+    def visit_ImportFrom(self, node):
+        if not node.level:
+            self._check_module(node, node.module)
+
+    def visit_Call(self, node):
+        # __import__("os") / importlib.import_module("os")
+        name = node.func.id if isinstance(node.func, ast.Name) else getattr(node.func, "attr", None)
+        if name in ("__import__", "import_module") and node.args and isinstance(node.args[0], ast.Constant):
+            self._check_module(node, str(node.args[0].value))
+        self.generic_visit(node)
+
+    def visit_While(self, node):
+        if isinstance(node.test, ast.Constant) and node.test.value and not _can_leave_loop(node.body):
+            self.problems.append(f"line {node.lineno}: infinite loop (`while {ast.unparse(node.test)}` with no break, return or raise)")
+        self.generic_visit(node)
+
+
+# yield/await hand control back to the caller, so `while True: yield x` in a
+# generator or an awaiting server loop is not stuck
+_SUSPENDS = (ast.Yield, ast.YieldFrom, ast.Await)
+
+
+def _can_leave_loop(body):
+    """True if a statement in the loop body can end or suspend the loop (ignoring nested loops' breaks and nested defs)."""
+    pending = list(body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.Return, ast.Raise, ast.Break) + _SUSPENDS):
+            return True
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else getattr(node.func, "attr", None)
+            if name in ("exit", "quit", "_exit"):
+                return True
+        if isinstance(node, (ast.While, ast.For, ast.AsyncFor)):
+            # A break in here only leaves the inner loop
+            pending.extend(n for n in ast.walk(node) if isinstance(n, (ast.Return, ast.Raise, ast.Call) + _SUSPENDS))
+            continue
+        pending.extend(ast.iter_child_nodes(node))
+    return False
+
+
+def precheck_python(code):
+    try:
+        tree = compile(code, "main.py", "exec", flags=ast.PyCF_ONLY_AST)
+    except (SyntaxError, ValueError) as e:
+        return _precheck_failure("".join(traceback.format_exception_only(type(e), e)))
+    visitor = _PrecheckVisitor()
+    visitor.visit(tree)
+    if visitor.problems:
+        return _precheck_failure("Submission rejected before running:\n" + "\n".join(visitor.problems) + "\n")
+    return None
+
+
+def precheck_syntax(language, code):
+    checker = SYNTAX_CHECKERS.get(language)
+    if checker is None or not local_runner.is_available(language):
+        return None
+    workdir = tempfile.mkdtemp(prefix="precheck-")
+    try:
+        with open(os.path.join(workdir, checker["source"]), "w", encoding="utf-8") as f:
+            f.write(code)
+        cmd = [arg.format(src=checker["source"]) for arg in checker["cmd"]]
+        result = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True, timeout=SYNTAX_CHECK_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if result.returncode != 0:
+        return _precheck_failure(result.stderr or result.stdout)
+    return None
+
+
+def precheck_code(language, code, backend=None):
     """
-    Executes code. Uses local execution for Python as a fallback 
-    since public Piston API is often discontinued or restricted.
+    Fast pre-execution stage. Returns None if the code may run, otherwise a
+    failed result in the execute_code shape. Python is parsed and AST-checked
+    in-process; C, C++ and JavaScript get a syntax-only check, but only when
+    they are headed for Piston, since a local build reports the same errors
+    without a network round trip.
     """
     if language == "python":
-        return execute_python_locally(code)
-    
-    # Try Piston API
+        return precheck_python(code)
+    if (backend or _select_backend(language)) == "piston":
+        return precheck_syntax(language, code)
+    return None
+
+
+def execute_code(language, code, stdin="", on_output=None):
+    """
+    Executes code. Python always runs locally; other languages run on the
+    local toolchain (see utils/local_runner.py) when available, since the
+    public Piston API is often discontinued or restricted. Local runs call
+    `on_output(stdout, stderr)` with partial output while the program runs.
+    Deterministic results are served from an in-memory cache on re-runs.
+    """
+    backend = _select_backend(language)
+    if isinstance(backend, dict):
+        return backend
+
+    rejected = precheck_code(language, code, backend)
+    if rejected is not None:
+        if on_output:
+            on_output(rejected["stdout"], rejected["stderr"])
+        return rejected
+
+    key = execution_cache_key(language, code, stdin, backend)
+    if key is not None:
+        cached = _result_cache.get(key)
+        if cached is not None:
+            if on_output:
+                on_output(cached["stdout"], cached["stderr"])
+            return dict(cached, cached=True)
+
+    if backend == "python":
+        result = execute_python_locally(code, stdin, on_output)
+    elif backend == "local":
+        result = local_runner.execute_locally(language, code, stdin, on_output=on_output)
+    else:
+        result = execute_piston(language, code, stdin)
+
+    if key is not None and _is_cacheable(result):
+        _result_cache.put(key, result)
+    return result
+
+def execute_piston(language, code, stdin=""):
+    """
+    Runs code on the healthiest configured Piston instance, failing over to
+    the others.
+    """
     lang_info = LANGUAGE_MAP.get(language)
     if not lang_info:
         return {"error": f"Unsupported language: {language}"}
@@ -34,67 +317,324 @@ def execute_code(language, code):
     payload = {
         "language": lang_info["language"],
         "version": lang_info["version"],
-        "files": [{"content": code}]
+        "files": [{"content": code}],
+        "stdin": stdin
     }
 
     try:
-        response = requests.post(PISTON_API_URL, json=payload, timeout=10)
-        
-        if response.status_code == 401 or response.status_code == 403 or response.status_code == 404:
+        result = get_piston_client().execute(payload)
+    except PistonUnavailable as e:
+        if e.statuses and all(status in (401, 403, 404) for status in e.statuses.values()):
             return {"error": (
-                f"The code execution service (Piston) for '{language}' returned {response.status_code}. "
+                f"The code execution service (Piston) for '{language}' is not available on any configured instance. "
                 "The official public Piston API was DISCONTINUED in Feb 2026. "
                 "To fix this, you can: \n"
-                "1. Host your own Piston instance and set PISTON_INSTANCE_URL in .env\n"
+                "1. Host your own Piston instance and set PISTON_INSTANCE_URLS in .env\n"
                 "2. Use a different language (Python is support locally out-of-the-box)\n"
                 "3. Configure a private Piston instance URL if you have one."
             )}
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        run_res = result.get("run", {})
-        return {
-            "stdout": run_res.get("stdout", ""),
-            "stderr": run_res.get("stderr", ""),
-            "output": run_res.get("output", ""),
-            "code": run_res.get("code", 0)
-        }
+        return {"error": f"API Error: {str(e)}. Install a local toolchain for '{language}' to run it without Piston."}
     except Exception as e:
-        return {"error": f"API Error: {str(e)}. Local execution is currently only supported for Python."}
+        return {"error": f"API Error: {str(e)}. Install a local toolchain for '{language}' to run it without Piston."}
+
+    run_res = result.get("run", {})
+    return {
+        "stdout": run_res.get("stdout", ""),
+        "stderr": run_res.get("stderr", ""),
+        "output": run_res.get("output", ""),
+        "code": run_res.get("code", 0)
+    }
+
+def execute_python_locally(code, stdin="", on_output=None):
+    """
+    Runs Python code on a warm sandbox worker, which skips interpreter
+    start-up. Falls back to a fresh subprocess where the pool is unsupported.
+    """
+    pool = get_python_pool()
+    if pool is not None:
+        return pool.run(code, stdin, on_output=on_output)
+    return execute_python_subprocess(code, stdin, on_output)
 
-def execute_python_locally(code):
+def execute_python_subprocess(code, stdin="", on_output=None):
     """
-    Runs Python code in a subprocess.
+    Runs Python code in a subprocess, streaming its output.
     """
+    temp_path = None
     try:
         with tempfile.NamedTemporaryFile(suffix=".py", delete=False, mode='w', encoding='utf-8') as f:
             f.write(code)
             temp_path = f.name
         
-        # Run the script with empty input to prevent hanging on input()
-        result = subprocess.run(
-            [sys.executable, temp_path],
-            input="", # Provide empty string to stdin
-            capture_output=True,
-            text=True,
-            timeout=15
-        )
-        
-        # Cleanup
-        os.unlink(temp_path)
-        
-        return {
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "output": result.stdout + result.stderr,
-            "code": result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
-        return {"error": "Execution timed out (15s limit). Please check for infinite loops or very slow logic."}
+        # Always provide stdin (empty by default) to prevent hanging on input()
+        return run_sandboxed([sys.executable, temp_path], stdin=stdin, timeout=15, on_output=on_output)
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
         return {"error": f"Local execution error: {str(e)}"}
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+# --- Complexity profiling ----------------------------------------------------
+
+COMPLEXITY_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "complexity_worker.py")
+PROFILE_SIZES = [2 ** k for k in range(1, 18)]
+PROFILE_WARMUPS = 1
+PROFILE_REPEATS = 3
+PROFILE_SIZE_BUDGET = 0.25
+PROFILE_TOTAL_BUDGET = 6.0
+
+# A growing model whose fitted curve rises less than this over the whole size
+# range is just noise on top of a constant
+MIN_MODEL_GROWTH = 0.25
+# A simpler class whose residual is within this factor of the best fit over
+# all sizes is preferred...
+SIMPLER_MODEL_TOLERANCE = 5.0
+# ...unless the best fit beats it by this factor on the largest sizes, where
+# the asymptotic term dominates. Cache and big-int effects make O(n) code like
+# sum(nums) or set(nums) bend upwards, so a small win is not enough.
+CLEAR_MODEL_MARGIN = 4.0
+PROFILE_TAIL_POINTS = 5
+
+# (label, f(n)); 2^n is only fitted while it stays finite
+COMPLEXITY_CLASSES = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) ** 2),
+    ("O(n^3)", lambda n: float(n) ** 3),
+    ("O(2^n)", lambda n: 2.0 ** n if n < 1000 else math.inf),
+]
+
+# Parameter names that hint at the kind of input to generate
+_SIZE_NAMES = {"n", "m", "size", "length", "num", "count", "limit"}
+_SMALL_INT_NAMES = {"k", "r", "c", "rows", "cols", "width", "height", "steps", "times"}
+_STR_NAMES = {"s", "t", "string", "text", "word", "pattern", "p", "str1", "str2", "a_str", "b_str"}
+_MATRIX_NAMES = {"grid", "matrix", "board", "mat"}
+_STR_LIST_NAMES = {"words", "strs", "strings", "tokens", "names"}
+
+
+def _annotation_kind(annotation):
+    text = ast.unparse(annotation).replace(" ", "").lower()
+    if text in ("list[list[int]]", "list[list[str]]"):
+        return "matrix"
+    if text in ("list[str]",):
+        return "str_list"
+    if text.startswith(("list", "tuple", "sequence")):
+        return "int_list"
+    if text == "str":
+        return "str"
+    return None
+
+
+def _param_kind(arg):
+    name = arg.arg.lower()
+    if arg.annotation is not None:
+        kind = _annotation_kind(arg.annotation)
+        if kind:
+            if kind == "int_list" and "sorted" in name:
+                return "sorted_int_list"
+            return kind
+        if ast.unparse(arg.annotation) == "int":
+            if name in _SIZE_NAMES:
+                return "size"
+            return "small_int" if name in _SMALL_INT_NAMES else "int"
+    if name in _MATRIX_NAMES:
+        return "matrix"
+    if name in _STR_LIST_NAMES:
+        return "str_list"
+    if name in _STR_NAMES:
+        return "str"
+    if name in _SIZE_NAMES:
+        return "size"
+    if name in _SMALL_INT_NAMES:
+        return "small_int"
+    if name in ("target", "x", "val", "value", "key"):
+        return "int"
+    if "sorted" in name:
+        return "sorted_int_list"
+    # nums, arr, prices, heights, ... are by far the most common
+    return "int_list"
+
+
+def find_profile_target(code):
+    """
+    Picks the function to profile from Python source: a LeetCode-style
+    `class Solution` method, otherwise `solve` or the first other top-level
+    function that is not stdin handling (DSA questions ask for the algorithm
+    in such a function, called by the code that reads stdin). Returns
+    (target, params) or (None, error message).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return None, f"Syntax error: {e}"
+
+    candidates = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef) and not item.name.startswith("_"):
+                    candidates.append(({"class": node.name, "name": item.name}, item.args.args[1:]))
+        elif isinstance(node, ast.FunctionDef) and node.name not in ("main", "solve_input", "read_input", "parse_input"):
+            candidates.append(({"class": None, "name": node.name}, node.args.args))
+    # The name the question asks for wins over helpers defined before it
+    candidates.sort(key=lambda candidate: candidate[0]["name"] != "solve")
+
+    for target, args in candidates:
+        if not args:
+            continue
+        params = [{"name": a.arg, "kind": _param_kind(a)} for a in args]
+        # At least one argument has to grow with n, otherwise there is nothing to measure
+        if any(p["kind"] not in ("int", "small_int") for p in params):
+            return target, params
+    return None, ("No function taking a sized input (list, string, matrix or n) was found to profile. "
+                  "Put the algorithm in a function such as `def solve(nums):` and call it from the code that reads stdin.")
+
+
+def _fit(points, f):
+    """Least-squares fit of t = a + b*f(n), weighted by 1/t^2 so every size counts equally."""
+    xs = [f(n) for n, _ in points]
+    if any(not math.isfinite(x) for x in xs):
+        return None
+    ws = [1.0 / (t * t) for _, t in points]
+    sw = sum(ws)
+    sx = sum(w * x for w, x in zip(ws, xs))
+    sy = sum(w * t for w, (_, t) in zip(ws, points))
+    sxx = sum(w * x * x for w, x in zip(ws, xs))
+    sxy = sum(w * x * t for w, x, (_, t) in zip(ws, xs, points))
+    denom = sw * sxx - sx * sx
+    b = (sw * sxy - sx * sy) / denom if denom > 0 else 0.0
+    if b < 0:
+        b = 0.0
+    a = (sy - b * sx) / sw
+    if a < 0:
+        # A negative constant means the model is too steep; refit through the origin
+        a, b = 0.0, sxy / sxx if sxx > 0 else 0.0
+    rss = sum(((a + b * x - t) / t) ** 2 for x, (_, t) in zip(xs, points))
+    # Predicted growth from the smallest to the largest size
+    low, high = a + b * min(xs), a + b * max(xs)
+    growth = high / low - 1.0 if low > 0 else math.inf
+    return rss, growth
+
+
+def fit_complexity(timings):
+    """
+    Fits (n, seconds) timings against the standard complexity classes.
+    Returns {"estimate", "confidence", "slope", "residuals"}; confidence is
+    how clearly the chosen class beats its closest alternative, scaled down
+    when only a few sizes could be measured.
+    """
+    points = [(t["n"], t["seconds"]) for t in timings if t["seconds"] > 0]
+    if len(points) < 4:
+        return {"error": "Too few sizes could be measured to estimate complexity."}
+
+    residuals = {}
+    for label, f in COMPLEXITY_CLASSES:
+        fit = _fit(points, f)
+        if fit is not None and (label == "O(1)" or fit[1] >= MIN_MODEL_GROWTH):
+            residuals[label] = fit[0]
+    ranked = sorted(residuals.items(), key=lambda item: item[1])
+    best_fit, best_rss = ranked[0]
+    others = [rss for label, rss in ranked if label != best_fit]
+    separation = 1.0 - best_rss / others[0] if others and others[0] > 0 else 1.0
+
+    functions = dict(COMPLEXITY_CLASSES)
+    tail_points = points[-PROFILE_TAIL_POINTS:]
+
+    def tail_rss(label):
+        fit = _fit(tail_points, functions[label])
+        return fit[0] if fit is not None else math.inf
+
+    # residuals is in class order, so simpler classes are tried first
+    best, closeness = best_fit, separation
+    best_tail = max(tail_rss(best_fit), 1e-12)
+    for label, rss in residuals.items():
+        if label == best_fit:
+            break
+        if rss > best_rss * SIMPLER_MODEL_TOLERANCE:
+            continue
+        margin = tail_rss(label) / best_tail
+        if margin < CLEAR_MODEL_MARGIN:
+            best, closeness = label, 1.0 - margin / CLEAR_MODEL_MARGIN
+            break
+        # The best fit won, but only as clearly as it beat this class
+        closeness = min(closeness, 1.0 - CLEAR_MODEL_MARGIN / margin)
+    closeness = max(0.0, closeness)
+    coverage = min(1.0, len(points) / 8)
+
+    # Log-log slope over the larger half of the sizes, for a sanity check
+    tail = points[len(points) // 2:]
+    slope = None
+    if len(tail) >= 2 and tail[-1][0] != tail[0][0]:
+        slope = math.log(tail[-1][1] / tail[0][1]) / math.log(tail[-1][0] / tail[0][0])
+
+    return {
+        "estimate": best,
+        "confidence": round(closeness * coverage, 2),
+        "slope": round(slope, 2) if slope is not None else None,
+        "residuals": {label: round(rss, 4) for label, rss in ranked},
+    }
+
+
+def estimate_complexity(language, code):
+    """
+    Profiling mode: times the candidate's function on generated inputs of
+    geometrically increasing size (with warmups and repeats, best time per
+    size) in a sandboxed subprocess and fits the curve. Only Python is
+    supported, since inputs are generated from the function's signature.
+    """
+    if language != "python":
+        return {"error": "Complexity profiling is only available for Python solutions."}
+    rejected = precheck_python(code)
+    if rejected is not None:
+        return {"error": rejected["stderr"]}
+    target, params = find_profile_target(code)
+    if target is None:
+        return {"error": params}
+
+    request = json.dumps({
+        "code": code,
+        "target": target,
+        "params": params,
+        "sizes": PROFILE_SIZES,
+        "warmups": PROFILE_WARMUPS,
+        "repeats": PROFILE_REPEATS,
+        "size_budget": PROFILE_SIZE_BUDGET,
+        "total_budget": PROFILE_TOTAL_BUDGET,
+    })
+    workdir = tempfile.mkdtemp(prefix="profile-")
+    try:
+        result = run_sandboxed([sys.executable, "-I", COMPLEXITY_WORKER], stdin=request, cwd=workdir,
+                               timeout=PROFILE_TOTAL_BUDGET * 3, cpu_seconds=int(PROFILE_TOTAL_BUDGET * 3))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if "error" in result:
+        return {"error": f"Profiling failed: {result['error']}"}
+    try:
+        measured = json.loads(result["stdout"])
+    except ValueError:
+        return {"error": f"Profiling crashed (exit code {result['code']}). {result['stderr']}".strip()}
+
+    report = fit_complexity(measured["timings"])
+    if measured["error"]:
+        # Partial timings are still useful; keep the reason they stopped
+        report["stopped"] = measured["error"]
+    report["function"] = f"{target['class']}.{target['name']}" if target["class"] else target["name"]
+    report["inputs"] = {p["name"]: p["kind"] for p in params}
+    report["timings"] = measured["timings"]
+    return report
+
+
+def summarize_complexity(report):
+    """One short paragraph for the grader."""
+    if not report or "error" in report:
+        return (report or {}).get("error", "Complexity was not measured.")
+    largest = report["timings"][-1]
+    text = (
+        f"Empirical time complexity of `{report['function']}`: {report['estimate']} "
+        f"(confidence {report['confidence']:.0%}, log-log slope {report['slope']}). "
+        f"Measured on generated inputs up to n={largest['n']} ({largest['seconds'] * 1000:.2f} ms per call)."
+    )
+    if report.get("stopped"):
+        text += f" Profiling stopped early: {report['stopped']}."
+    return text
@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Comma-separated list of Piston execute endpoints. PISTON_INSTANCE_URL (a
+# single URL) is still honoured for existing .env files.
+DEFAULT_INSTANCE_URL = "https://emkc.org/api/v2/piston/execute"
+PROBE_INTERVAL_SECONDS = float(os.getenv("PISTON_PROBE_INTERVAL", "30"))
+REQUEST_TIMEOUT_SECONDS = 10
+PROBE_TIMEOUT_SECONDS = 3
+# Weight of the newest sample in the latency / error-rate moving averages
+EWMA_ALPHA = 0.3
+# An instance is taken out of rotation after this many consecutive failures
+# and re-admitted by the next successful probe
+MAX_CONSECUTIVE_FAILURES = 3
+
+# Statuses that mean "this instance cannot serve us", not "bad request"
+INSTANCE_FAILURE_STATUSES = {401, 403, 404, 408, 429, 500, 502, 503, 504}
+
+
+def instance_urls_from_env():
+    raw = os.getenv("PISTON_INSTANCE_URLS") or os.getenv("PISTON_INSTANCE_URL") or DEFAULT_INSTANCE_URL
+    return [url.strip() for url in raw.split(",") if url.strip()]
+
+
+def runtimes_url(execute_url):
+    """Piston serves GET .../runtimes next to POST .../execute."""
+    base = execute_url.rstrip("/")
+    if base.endswith("/execute"):
+        base = base[: -len("/execute")]
+    return base + "/runtimes"
+
+
+class PistonUnavailable(Exception):
+    """Every instance failed. `statuses` holds the last HTTP status seen per URL (None = no response)."""
+
+    def __init__(self, message, statuses):
+        super().__init__(message)
+        self.statuses = statuses
+
+
+class PistonInstance:
+    def __init__(self, url):
+        self.url = url
+        self.probe_url = runtimes_url(url)
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.healthy = True
+        self.last_status = None
+        self.requests = 0
+        self.failures = 0
+        self.probes = 0
+        self.last_probe = None
+
+    def record_success(self, latency, status=200):
+        self.latency = latency if self.latency is None else self.latency + EWMA_ALPHA * (latency - self.latency)
+        self.error_rate += EWMA_ALPHA * (0.0 - self.error_rate)
+        self.consecutive_failures = 0
+        self.healthy = True
+        self.last_status = status
+
+    def record_failure(self, status=None):
+        self.error_rate += EWMA_ALPHA * (1.0 - self.error_rate)
+        self.consecutive_failures += 1
+        self.failures += 1
+        self.last_status = status
+        if self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+            self.healthy = False
+
+    def score(self):
+        """Lower is better: expected latency inflated by the recent error rate."""
+        latency = self.latency if self.latency is not None else 1.0
+        return latency * (1.0 + 4.0 * self.error_rate)
+
+
+class PistonClient:
+    """
+    Client for a list of Piston instances. A background thread probes every
+    instance's /runtimes endpoint; requests go to the healthy instance with
+    the best latency/error score over pooled keep-alive connections and fail
+    over to the next one on connection errors, timeouts and instance-level
+    HTTP errors.
+    """
+
+    def __init__(self, urls=None, probe_interval=PROBE_INTERVAL_SECONDS, timeout=REQUEST_TIMEOUT_SECONDS,
+                 pool_size=10):
+        self.instances = [PistonInstance(url) for url in (urls or instance_urls_from_env())]
+        self.probe_interval = probe_interval
+        self.timeout = timeout
+        self.failovers = 0
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(1, len(self.instances)), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober = None
+
+    def start(self):
+        """Starts background probing (idempotent)."""
+        with self._lock:
+            if self._prober is None and self.probe_interval:
+                self._prober = threading.Thread(target=self._probe_loop, name="piston-prober", daemon=True)
+                self._prober.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+
+    def probe(self, instance):
+        start = time.perf_counter()
+        try:
+            response = self.session.get(instance.probe_url, timeout=PROBE_TIMEOUT_SECONDS)
+            status = response.status_code
+        except requests.RequestException:
+            status = None
+        latency = time.perf_counter() - start
+        with self._lock:
+            instance.probes += 1
+            instance.last_probe = time.time()
+            if status == 200:
+                instance.record_success(latency, status)
+            else:
+                instance.record_failure(status)
+
+    def probe_all(self):
+        for instance in self.instances:
+            self.probe(instance)
+
+    def ranked_instances(self):
+        """Healthy instances by score, then unhealthy ones as a last resort."""
+        with self._lock:
+            return sorted(self.instances, key=lambda i: (not i.healthy, i.score()))
+
+    def execute(self, payload):
+        """
+        POSTs an execute payload, failing over between instances. Returns the
+        decoded JSON body; raises PistonUnavailable if no instance answered.
+        """
+        statuses = {}
+        last_error = None
+        for attempt, instance in enumerate(self.ranked_instances()):
+            if attempt:
+                with self._lock:
+                    self.failovers += 1
+            start = time.perf_counter()
+            try:
+                response = self.session.post(instance.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                with self._lock:
+                    instance.requests += 1
+                    instance.record_failure()
+                statuses[instance.url] = None
+                last_error = str(e)
+                continue
+            latency = time.perf_counter() - start
+            statuses[instance.url] = response.status_code
+            with self._lock:
+                instance.requests += 1
+                if response.status_code in INSTANCE_FAILURE_STATUSES:
+                    instance.record_failure(response.status_code)
+                else:
+                    instance.record_success(latency, response.status_code)
+            if response.status_code in INSTANCE_FAILURE_STATUSES:
+                last_error = f"HTTP {response.status_code} from {instance.url}"
+                continue
+            # Anything else (including 400 for an unknown runtime) is the
+            # answer for this request; another instance would say the same
+            response.raise_for_status()
+            return response.json()
+        raise PistonUnavailable(f"All Piston instances failed (last error: {last_error})", statuses)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "failovers": self.failovers,
+                "instances": [
+                    {
+                        "url": i.url,
+                        "healthy": i.healthy,
+                        "latency_ewma_seconds": i.latency,
+                        "error_rate": round(i.error_rate, 4),
+                        "consecutive_failures": i.consecutive_failures,
+                        "last_status": i.last_status,
+                        "requests": i.requests,
+                        "failures": i.failures,
+                        "probes": i.probes,
+                    }
+                    for i in self.instances
+                ],
+            }
+
+    def export_prometheus(self):
+        snapshot = self.snapshot()
+        metrics = [
+            ("piston_instance_up", "gauge", "1 if the instance is in rotation", lambda i: int(i["healthy"])),
+            ("piston_instance_latency_seconds", "gauge", "EWMA of request/probe latency",
+             lambda i: i["latency_ewma_seconds"] if i["latency_ewma_seconds"] is not None else "NaN"),
+            ("piston_instance_error_rate", "gauge", "EWMA of the failure ratio", lambda i: i["error_rate"]),
+            ("piston_instance_requests_total", "counter", "Execute requests sent", lambda i: i["requests"]),
+            ("piston_instance_failures_total", "counter", "Failed requests and probes", lambda i: i["failures"]),
+        ]
+        lines = []
+        for name, kind, help_text, value in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for instance in snapshot["instances"]:
+                lines.append(f'{name}{{url="{instance["url"]}"}} {value(instance)}')
+        lines.append("# HELP piston_failovers_total Requests retried on another instance")
+        lines.append("# TYPE piston_failovers_total counter")
+        lines.append(f"piston_failovers_total {snapshot['failovers']}")
+        return "\n".join(lines) + "\n"
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_piston_client():
+    """Process-wide client for the instances configured in the environment."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PistonClient().start()
+    return _client
@@ -0,0 +1,131 @@
+"""
+Local stand-in for a Piston instance, for exercising utils/piston_client.py.
+
+    python -m utils.piston_mock_server --port 2000 --latency 0.05 --fail-rate 0.1
+
+serves GET /api/v2/runtimes and POST /api/v2/execute. Python submissions are
+really executed (sandboxed); other languages get a canned answer. The
+behaviour of a running server can be changed through `server.behaviour` to
+simulate slow, flaky or dead instances.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.sandbox import run_sandboxed
+
+RUNTIMES = [
+    {"language": "python", "version": "3.10.0", "aliases": ["py", "python3"]},
+    {"language": "javascript", "version": "18.15.0", "aliases": ["node", "js"]},
+    {"language": "c++", "version": "10.2.0", "aliases": ["cpp", "g++"]},
+    {"language": "c", "version": "10.2.0", "aliases": ["gcc"]},
+    {"language": "java", "version": "15.0.2", "aliases": []},
+    {"language": "csharp", "version": "6.12.0", "aliases": ["mono", "cs"]},
+]
+
+
+def default_behaviour(latency=0.0, fail_rate=0.0, status=None):
+    # status forces every response (e.g. 503 or 401) when set
+    return {"latency": latency, "fail_rate": fail_rate, "status": status, "rng": random.Random(0)}
+
+
+class MockPistonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _forced_failure(self):
+        """Applies the configured latency and returns an error status to send, if any."""
+        behaviour = self.server.behaviour
+        time.sleep(behaviour["latency"])
+        if behaviour["status"]:
+            return behaviour["status"]
+        if behaviour["fail_rate"] and behaviour["rng"].random() < behaviour["fail_rate"]:
+            return 503
+        return None
+
+    def do_GET(self):
+        if not self.path.rstrip("/").endswith("/runtimes"):
+            self._send_json(404, {"message": f"Unknown path {self.path}"})
+            return
+        status = self._forced_failure()
+        if status:
+            self._send_json(status, {"message": "Mock failure"})
+            return
+        self._send_json(200, RUNTIMES)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/execute"):
+            self._send_json(404, {"message": f"Unknown path {self.path}"})
+            return
+        status = self._forced_failure()
+        if status:
+            self._send_json(status, {"message": "Mock failure"})
+            return
+        runtime = next((r for r in RUNTIMES if body.get("language") in [r["language"]] + r["aliases"]), None)
+        if runtime is None:
+            self._send_json(400, {"message": f"{body.get('language')}-{body.get('version')} runtime is unknown"})
+            return
+
+        code = (body.get("files") or [{}])[0].get("content", "")
+        if runtime["language"] == "python":
+            result = run_sandboxed([sys.executable, "-I", "-c", code], stdin=body.get("stdin", ""), timeout=10)
+            run = {"stdout": result.get("stdout", ""), "stderr": result.get("stderr", ""),
+                   "code": result.get("code"), "signal": None}
+            if "error" in result:
+                run.update(code=None, signal="SIGKILL")
+        else:
+            run = {"stdout": f"mock run of {runtime['language']}\n", "stderr": "", "code": 0, "signal": None}
+        run["output"] = run["stdout"] + run["stderr"]
+        self.server.executions += 1
+        self._send_json(200, {"language": runtime["language"], "version": runtime["version"], "run": run})
+
+
+def start_mock_piston(latency=0.0, fail_rate=0.0, status=None, host="127.0.0.1", port=0):
+    """
+    Starts a mock instance on a daemon thread. `server.url` is its execute
+    endpoint; mutate `server.behaviour` to change how it responds.
+    """
+    server = ThreadingHTTPServer((host, port), MockPistonHandler)
+    server.daemon_threads = True
+    server.behaviour = default_behaviour(latency, fail_rate, status)
+    server.executions = 0
+    server.url = f"http://{host}:{server.server_port}/api/v2/execute"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Piston code execution API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--status", type=int, help="Answer every request with this HTTP status")
+    args = parser.parse_args()
+
+    server = start_mock_piston(args.latency, args.fail_rate, args.status, args.host, args.port)
+    print(f"Mock Piston listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
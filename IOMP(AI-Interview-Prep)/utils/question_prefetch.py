@@ -0,0 +1,163 @@
+import json
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.grok_api import call_grok_api, GroqAPIError
+
+# Number of ready-to-serve questions kept per (role, round, category, difficulty)
+WARM_POOL_SIZE = 2
+TEST_CASE_COUNT = 8
+# Technical categories whose questions have one checkable stdin/stdout answer;
+# System Design and Project-based Scenario questions do not
+STDIO_CATEGORIES = ("DSA", "Logic & Math")
+
+
+def question_key(role, round_type, category, difficulty):
+    return (role, round_type, category, difficulty)
+
+
+def is_stdio_category(category):
+    """True for categories that get stdin/stdout programs and generated test cases."""
+    return any(name in (category or "") for name in STDIO_CATEGORIES)
+
+
+def build_question_prompt(role, round_type, category, difficulty):
+    if "Technical" in round_type:
+        prompt = (
+            f"Generate a {difficulty} difficulty coding interview question in the category of '{category}' for a {role} role. "
+            "If the category is DSA, focus on a high-quality problem (e.g., Arrays, Strings, Trees, DP) that is commonly asked in real interviews. "
+            "Keep the question text and requirements EXTREMELY CONCISE (max 3-4 sentences total). "
+        )
+        if is_stdio_category(category):
+            prompt += (
+                "The solution must be a full program that reads its input from stdin and prints the answer to stdout; "
+                "state the exact input and output format in one sentence. "
+            )
+        if "DSA" in category:
+            # Complexity profiling times this function on generated inputs
+            prompt += (
+                "Require the core algorithm to be a function that takes the parsed input values as parameters "
+                "(e.g. `solve(nums, k)`), called by the code that reads stdin. "
+            )
+        return prompt + "Return ONLY the question text and requirements, no code."
+    return (
+        f"Generate a {difficulty} difficulty behavioral/HR interview question focused on '{category}' for a {role} role. "
+        "The question should be a realistic industry scenario and concise (max 2 sentences). "
+        "Return ONLY the question text."
+    )
+
+
+def generate_question(key):
+    call_site = "tech_question" if "Technical" in key[1] else "hr_question"
+    # Never cached: every candidate should get a freshly generated question.
+    return call_grok_api([{"role": "user", "content": build_question_prompt(*key)}], cache=False,
+                         priority="question", call_site=call_site)
+
+
+def generate_test_cases(question, count=TEST_CASE_COUNT):
+    """
+    Asks the LLM for stdin/stdout test cases for a coding question. Returns a
+    list of {"input", "expected_output"} dicts, or [] if the reply is unusable.
+    """
+    prompt = (
+        f"Write {count} test cases for this coding interview question:\n\n{question}\n\n"
+        "Cover edge cases (empty/minimal input, duplicates, large values) and a few ordinary cases. "
+        "Each case is the exact stdin text and the exact expected stdout text. Double-check every expected output. "
+        'Return ONLY a JSON array like [{"input": "3\\n1 2 3\\n", "expected_output": "6\\n"}], no prose.'
+    )
+    try:
+        reply = call_grok_api([{"role": "user", "content": prompt}], temperature=0.2,
+                              priority="background", call_site="test_cases")
+    except GroqAPIError as e:
+        print(f"Test case generation failed: {e}")
+        return []
+    # Models like to wrap JSON in a code fence
+    match = re.search(r"\[.*\]", reply, re.DOTALL)
+    try:
+        # strict=False tolerates raw newlines inside strings
+        cases = json.loads(match.group(0), strict=False) if match else []
+    except ValueError:
+        print("Test case generation returned invalid JSON")
+        return []
+    return [
+        {"input": str(c["input"]), "expected_output": str(c["expected_output"])}
+        for c in cases if isinstance(c, dict) and "input" in c and "expected_output" in c
+    ]
+
+
+def submit_test_cases(question, category):
+    """
+    Generates test cases for `question` on the prefetch executor; returns a
+    future, or None for categories that have no stdin/stdout answer.
+    """
+    if not is_stdio_category(category):
+        return None
+    return get_prefetcher().submit(generate_test_cases, question)
+
+
+class QuestionPrefetcher:
+    """
+    Keeps a small warm pool of generated questions per interview setup so that
+    "Ask Next Question" can be served without waiting on the LLM. Pools are
+    shared by every session in the process; a question is handed out once.
+    """
+
+    def __init__(self, pool_size=WARM_POOL_SIZE, max_workers=4):
+        self.pool_size = pool_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="question-prefetch")
+        self._ready = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """Runs other question-related LLM work (e.g. test cases) on the prefetch threads."""
+        return self._executor.submit(fn, *args)
+
+    def warm(self, key):
+        """Schedules background generation until the pool for `key` is full."""
+        with self._lock:
+            ready = self._ready.setdefault(key, deque())
+            missing = self.pool_size - len(ready) - self._in_flight.get(key, 0)
+            if missing <= 0:
+                return
+            self._in_flight[key] = self._in_flight.get(key, 0) + missing
+        for _ in range(missing):
+            self._executor.submit(self._fill, key)
+
+    def take(self, key):
+        """Returns a prefetched question for `key`, or None if none is ready yet."""
+        with self._lock:
+            ready = self._ready.get(key)
+            question = ready.popleft() if ready else None
+        self.warm(key)
+        return question
+
+    def _fill(self, key):
+        question = None
+        try:
+            question = generate_question(key)
+        except GroqAPIError as e:
+            print(f"Question prefetch failed for {key}: {e}")
+        except Exception as e:
+            print(f"Question prefetch crashed for {key}: {e}")
+        finally:
+            # Always release the slot, or this key would never be refilled
+            with self._lock:
+                self._in_flight[key] -= 1
+                if question:
+                    self._ready.setdefault(key, deque()).append(question)
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = QuestionPrefetcher()
+    return _prefetcher
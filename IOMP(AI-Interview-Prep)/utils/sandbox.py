@@ -0,0 +1,289 @@
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, callers fall back to plain subprocesses
+    resource = None
+
+# Default per-run limits for candidate code
+MEMORY_LIMIT_MB = 512
+CPU_LIMIT_SECONDS = 10
+FILE_SIZE_LIMIT_MB = 16
+WALL_TIMEOUT_SECONDS = 15
+# RLIMIT_NPROC counts every process/thread of the server's user, not just this
+# run, so it is a fork-bomb backstop; run the app as a dedicated user.
+NPROC_LIMIT = int(os.getenv("SANDBOX_NPROC_LIMIT", "1024"))
+
+# Only the last OUTPUT_BUFFER_BYTES of each stream are kept; a program that
+# writes more than OUTPUT_LIMIT_BYTES in total is killed.
+OUTPUT_BUFFER_BYTES = 64 * 1024
+OUTPUT_LIMIT_BYTES = 8 * 1024 * 1024
+# Minimum seconds between on_output callbacks
+OUTPUT_CALLBACK_INTERVAL = 0.1
+
+# Delegated cgroup v2 directory (writable by this user) under which each run
+# gets its own cgroup. Skipped silently when it does not exist.
+CGROUP_ROOT = os.getenv("SANDBOX_CGROUP_ROOT", "/sys/fs/cgroup/interview-coach")
+CGROUP_PIDS_MAX = 64
+
+SANDBOX_SUPPORTED = resource is not None and os.name == "posix"
+
+
+def _set_limit(kind, soft, hard=None):
+    try:
+        resource.setrlimit(kind, (soft, soft if hard is None else hard))
+    except (ValueError, OSError):
+        # Cannot raise above an existing hard limit; keep whatever is stricter
+        pass
+
+
+def apply_rlimits(memory_mb=MEMORY_LIMIT_MB, cpu_seconds=CPU_LIMIT_SECONDS, file_size_mb=FILE_SIZE_LIMIT_MB,
+                  nproc=NPROC_LIMIT, cgroup=None):
+    """Applies resource limits to the current process (use as a preexec_fn)."""
+    if resource is None:
+        return
+    os.setsid()
+    if cgroup:
+        try:
+            with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+                f.write(str(os.getpid()))
+        except OSError:
+            pass
+    if memory_mb:
+        _set_limit(resource.RLIMIT_AS, memory_mb * 1024 * 1024)
+    if cpu_seconds:
+        # Hard limit one second above the soft one so SIGXCPU arrives first
+        _set_limit(resource.RLIMIT_CPU, cpu_seconds, cpu_seconds + 1)
+    if file_size_mb:
+        _set_limit(resource.RLIMIT_FSIZE, file_size_mb * 1024 * 1024)
+    if nproc:
+        _set_limit(resource.RLIMIT_NPROC, nproc)
+    _set_limit(resource.RLIMIT_CORE, 0)
+
+
+def rlimit_preexec(memory_mb=MEMORY_LIMIT_MB, cpu_seconds=CPU_LIMIT_SECONDS, file_size_mb=FILE_SIZE_LIMIT_MB,
+                   nproc=NPROC_LIMIT, cgroup=None):
+    """Returns a preexec_fn for subprocess.Popen, or None where unsupported."""
+    if not SANDBOX_SUPPORTED:
+        return None
+    return lambda: apply_rlimits(memory_mb, cpu_seconds, file_size_mb, nproc, cgroup)
+
+
+def _write_cgroup_file(path, name, value):
+    try:
+        with open(os.path.join(path, name), "w") as f:
+            f.write(value)
+        return True
+    except OSError:
+        # Controller not enabled for this subtree
+        return False
+
+
+_cgroup_checked = False
+
+
+def create_cgroup(memory_mb=MEMORY_LIMIT_MB, pids_max=CGROUP_PIDS_MAX):
+    """
+    Creates a cgroup v2 child under CGROUP_ROOT with memory and pids limits,
+    or returns None when no delegated cgroup tree is available. Unlike
+    rlimits, these cover every process the run starts and its page cache.
+    """
+    global _cgroup_checked
+    # cgroup.procs only exists inside a mounted cgroup v2 hierarchy
+    procs = os.path.join(CGROUP_ROOT, "cgroup.procs")
+    if not SANDBOX_SUPPORTED or not os.path.exists(procs) or not os.access(CGROUP_ROOT, os.W_OK):
+        return None
+    if not _cgroup_checked:
+        _write_cgroup_file(CGROUP_ROOT, "cgroup.subtree_control", "+memory +pids")
+        _cgroup_checked = True
+    try:
+        path = tempfile.mkdtemp(prefix="run-", dir=CGROUP_ROOT)
+    except OSError as e:
+        print(f"Could not create sandbox cgroup: {e}")
+        return None
+    if memory_mb:
+        _write_cgroup_file(path, "memory.max", str(memory_mb * 1024 * 1024))
+        _write_cgroup_file(path, "memory.swap.max", "0")
+        _write_cgroup_file(path, "memory.oom.group", "1")
+    if pids_max:
+        _write_cgroup_file(path, "pids.max", str(pids_max))
+    return path
+
+
+def remove_cgroup(path):
+    """Kills anything left in the cgroup and removes it."""
+    if not path:
+        return
+    _write_cgroup_file(path, "cgroup.kill", "1")
+    for _ in range(50):
+        try:
+            os.rmdir(path)
+            return
+        except FileNotFoundError:
+            return
+        except OSError:
+            # Still populated for a moment after cgroup.kill
+            time.sleep(0.01)
+    print(f"Could not remove sandbox cgroup {path}")
+
+
+class OutputBuffer:
+    """
+    Ring buffer over a byte stream: keeps only the last `max_bytes` bytes but
+    counts everything written, so the text says how much was dropped.
+    """
+
+    def __init__(self, max_bytes=OUTPUT_BUFFER_BYTES):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._chunks = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        with self._lock:
+            self.total += len(data)
+            self._chunks.append(data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                excess = self._size - self.max_bytes
+                head = self._chunks[0]
+                if len(head) <= excess:
+                    self._chunks.popleft()
+                    self._size -= len(head)
+                else:
+                    self._chunks[0] = head[excess:]
+                    self._size -= excess
+
+    def text(self):
+        with self._lock:
+            data = b"".join(self._chunks)
+            dropped = self.total - self._size
+        text = data.decode("utf-8", errors="replace")
+        if dropped:
+            return f"[... {dropped} earlier bytes truncated ...]\n{text}"
+        return text
+
+
+def _pump(stream, buffer, produced, limit_hit, changed):
+    fd = stream.fileno()
+    while True:
+        try:
+            chunk = os.read(fd, 65536)
+        except OSError:
+            break
+        if not chunk:
+            break
+        buffer.write(chunk)
+        changed.set()
+        if produced() > OUTPUT_LIMIT_BYTES:
+            limit_hit.set()
+    stream.close()
+
+
+def run_sandboxed(cmd, stdin="", timeout=WALL_TIMEOUT_SECONDS, cwd=None,
+                  memory_mb=MEMORY_LIMIT_MB, cpu_seconds=CPU_LIMIT_SECONDS, env=None, on_output=None):
+    """
+    Runs a command with rlimits (and a per-run cgroup where available) and a
+    wall-clock timeout. stdout/stderr are read incrementally into ring
+    buffers; `on_output(stdout, stderr)` is called with the partial text while
+    the program runs. Returns the result dict shape used by execute_code, or
+    {"error": ..., "stdout", "stderr"} on timeout.
+    """
+    cgroup = create_cgroup(memory_mb)
+    with tempfile.TemporaryFile() as stdin_file:
+        # A file rather than a pipe: no writer thread, and no deadlock when the
+        # program ignores its input
+        stdin_file.write(stdin.encode("utf-8"))
+        stdin_file.seek(0)
+        proc = subprocess.Popen(
+            cmd,
+            stdin=stdin_file,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            preexec_fn=rlimit_preexec(memory_mb, cpu_seconds, cgroup=cgroup),
+        )
+
+    out, err = OutputBuffer(), OutputBuffer()
+    limit_hit, changed = threading.Event(), threading.Event()
+    produced = lambda: out.total + err.total
+    pumps = [
+        threading.Thread(target=_pump, args=(proc.stdout, out, produced, limit_hit, changed), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, err, produced, limit_hit, changed), daemon=True),
+    ]
+    for pump in pumps:
+        pump.start()
+
+    deadline = time.monotonic() + timeout
+    last_callback = 0.0
+    timed_out = False
+    try:
+        while True:
+            try:
+                proc.wait(timeout=min(OUTPUT_CALLBACK_INTERVAL, max(0.0, deadline - time.monotonic())))
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if limit_hit.is_set():
+                kill_process_group(proc)
+                proc.wait()
+                break
+            if time.monotonic() >= deadline:
+                timed_out = True
+                kill_process_group(proc)
+                proc.wait()
+                break
+            if on_output and changed.is_set() and time.monotonic() - last_callback >= OUTPUT_CALLBACK_INTERVAL:
+                changed.clear()
+                last_callback = time.monotonic()
+                on_output(out.text(), err.text())
+    finally:
+        if proc.poll() is None:
+            kill_process_group(proc)
+            proc.wait()
+        for pump in pumps:
+            pump.join(timeout=1)
+        remove_cgroup(cgroup)
+
+    stdout, stderr = out.text(), err.text()
+    if timed_out:
+        return {"error": f"Execution timed out ({timeout}s limit). Please check for infinite loops or very slow logic.",
+                "stdout": stdout, "stderr": stderr}
+    if limit_hit.is_set():
+        stderr += f"\nKilled: output limit of {OUTPUT_LIMIT_BYTES // (1024 * 1024)} MiB exceeded."
+    elif proc.returncode < 0:
+        stderr += describe_signal(-proc.returncode)
+    if on_output:
+        on_output(stdout, stderr)
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "output": stdout + stderr,
+        "code": proc.returncode
+    }
+
+
+def describe_signal(signum):
+    try:
+        name = signal.Signals(signum).name
+    except ValueError:
+        name = f"signal {signum}"
+    if name == "SIGXCPU":
+        return f"\nKilled by {name}: CPU time limit exceeded."
+    return f"\nKilled by {name}. The program may have exceeded the sandbox memory or resource limits."
+
+
+def kill_process_group(proc):
+    try:
+        # Sandboxed commands are session leaders, so this also reaps children
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        proc.kill()
@@ -0,0 +1,208 @@
+import json
+import os
+import queue
+import select
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from utils.exec_scheduler import EXEC_WORKERS
+from utils.sandbox import (
+    CPU_LIMIT_SECONDS, MEMORY_LIMIT_MB, OUTPUT_CALLBACK_INTERVAL, OUTPUT_LIMIT_BYTES, SANDBOX_SUPPORTED,
+    WALL_TIMEOUT_SECONDS, OutputBuffer, create_cgroup, kill_process_group, remove_cgroup, rlimit_preexec
+)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+HEADER = struct.Struct(">I")
+
+# Every Python run goes through the execution scheduler, which runs at most
+# EXEC_WORKERS jobs at once, so one warm worker per scheduler slot means a
+# run never waits for a worker
+POOL_SIZE = int(os.getenv("PYTHON_POOL_SIZE", str(EXEC_WORKERS)))
+MAX_RUNS_PER_WORKER = int(os.getenv("PYTHON_POOL_MAX_RUNS", "25"))
+
+
+class WorkerTimeout(Exception):
+    pass
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class PythonWorker:
+    """One pre-started, rlimited interpreter that executes code sent over a pipe."""
+
+    def __init__(self, memory_mb=MEMORY_LIMIT_MB):
+        self.workdir = tempfile.mkdtemp(prefix="py-sandbox-")
+        # One cgroup per worker for its whole life; it is recycled often enough
+        self.cgroup = create_cgroup(memory_mb)
+        self.proc = subprocess.Popen(
+            [sys.executable, "-I", WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.workdir,
+            # CPU time is limited per run by the worker itself
+            preexec_fn=rlimit_preexec(memory_mb=memory_mb, cpu_seconds=None, cgroup=self.cgroup),
+        )
+        self.runs = 0
+
+    def _read_exact(self, size, deadline):
+        fd = self.proc.stdout.fileno()
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerTimeout()
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                raise WorkerTimeout()
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise WorkerCrashed(self.proc.poll())
+            data += chunk
+        return data
+
+    def _read_frame(self, deadline):
+        (size,) = HEADER.unpack(self._read_exact(HEADER.size, deadline))
+        return json.loads(self._read_exact(size, deadline))
+
+    def run(self, code, stdin="", timeout=WALL_TIMEOUT_SECONDS, cpu_seconds=CPU_LIMIT_SECONDS,
+            out=None, err=None, on_output=None):
+        """
+        Executes `code`, collecting its output frames into the `out`/`err`
+        ring buffers as they arrive. Returns the worker's result frame.
+        """
+        request = json.dumps({
+            "code": code, "stdin": stdin, "cpu_seconds": cpu_seconds, "output_limit": OUTPUT_LIMIT_BYTES
+        }).encode("utf-8")
+        try:
+            self.proc.stdin.write(HEADER.pack(len(request)) + request)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise WorkerCrashed(self.proc.poll())
+        self.runs += 1
+        out = out if out is not None else OutputBuffer()
+        err = err if err is not None else OutputBuffer()
+        deadline = time.monotonic() + timeout
+        last_callback = time.monotonic()
+        while True:
+            frame = self._read_frame(deadline)
+            if "code" in frame:
+                return frame
+            (out if frame["stream"] == "stdout" else err).write(frame["data"].encode("utf-8"))
+            if on_output and time.monotonic() - last_callback >= OUTPUT_CALLBACK_INTERVAL:
+                last_callback = time.monotonic()
+                on_output(out.text(), err.text())
+
+    def kill(self):
+        if self.proc.poll() is None:
+            kill_process_group(self.proc)
+        self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        remove_cgroup(self.cgroup)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class PythonWorkerPool:
+    """
+    Fixed-size pool of warm Python workers. Each run executes in a fork of a
+    worker with a fresh working directory, the CPU/memory rlimits and a
+    wall-clock timeout, so runs cannot see each other's state. Workers are
+    retired after `max_runs` runs or after any violation or protocol error
+    (timeout, crash, rlimit kill, corrupted frame), and replaced in the
+    background so the next run does not pay interpreter start-up.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_runs=MAX_RUNS_PER_WORKER):
+        self.size = size
+        self.max_runs = max_runs
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._spawn_async()
+
+    def _spawn(self):
+        try:
+            self._idle.put(PythonWorker())
+        except OSError as e:
+            print(f"Could not start Python sandbox worker: {e}")
+
+    def _spawn_async(self):
+        threading.Thread(target=self._spawn, daemon=True).start()
+
+    def _retire(self, worker):
+        threading.Thread(target=worker.kill, daemon=True).start()
+        self._spawn_async()
+
+    def run(self, code, stdin="", timeout=WALL_TIMEOUT_SECONDS, on_output=None):
+        """Returns the same result dict shape as execute_python_locally."""
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            self._spawn_async()
+            return {"error": "No Python sandbox worker became available. Please try again."}
+        out, err = OutputBuffer(), OutputBuffer()
+        try:
+            result = worker.run(code, stdin=stdin, timeout=timeout, out=out, err=err, on_output=on_output)
+        except WorkerTimeout:
+            self._retire(worker)
+            return {"error": f"Execution timed out ({timeout}s limit). Please check for infinite loops or very slow logic.",
+                    "stdout": out.text(), "stderr": err.text()}
+        except WorkerCrashed:
+            try:
+                returncode = worker.proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                returncode = None
+            self._retire(worker)
+            if returncode is not None and returncode < 0:
+                # Killed by a signal: SIGXCPU for the CPU limit, SIGKILL/SIGSEGV otherwise
+                return {"error": f"Execution was terminated by the sandbox (signal {-returncode}). Your program may have exceeded the CPU or memory limit."}
+            return {"error": "Execution failed: the sandbox worker exited unexpectedly."}
+        except Exception as e:
+            # Anything else (e.g. an unreadable frame) means the worker's
+            # stream can no longer be trusted
+            print(f"Python sandbox worker failed: {e}")
+            self._retire(worker)
+            return {"error": "Execution failed: the sandbox worker returned an invalid response.",
+                    "stdout": out.text(), "stderr": err.text()}
+
+        if worker.runs >= self.max_runs:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+        stdout, stderr = out.text(), err.text()
+        if result.get("limit_exceeded"):
+            stderr += f"\nKilled: output limit of {OUTPUT_LIMIT_BYTES // (1024 * 1024)} MiB exceeded."
+        if on_output:
+            on_output(stdout, stderr)
+        return {
+            "stdout": stdout,
+            "stderr": stderr,
+            "output": stdout + stderr,
+            "code": result["code"],
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_python_pool():
+    """Process-wide pool, or None on platforms without rlimits/select on pipes."""
+    global _pool
+    if not SANDBOX_SUPPORTED:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PythonWorkerPool()
+    return _pool
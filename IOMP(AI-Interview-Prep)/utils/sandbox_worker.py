@@ -0,0 +1,239 @@
+"""
+Warm Python worker used by utils/sandbox_pool.py. Started with `python -I`,
+so it must not import anything from this project.
+
+Protocol: the parent writes length-prefixed JSON requests
+{"code": str, "stdin": str, "cpu_seconds": int, "output_limit": int} to our
+stdin and reads length-prefixed JSON frames from our stdout: any number of
+{"stream": "stdout"|"stderr", "data": str} output frames while the code runs,
+then one {"code", "limit_exceeded"} result frame. The real fds 0/1/2 are
+moved out of the way first so user code can never write into the protocol
+stream.
+
+Each request runs in a fork() of this pre-imported worker, in a fresh
+temporary directory, so nothing a submission patches (modules, builtins,
+files, threads) survives into the next one. If the child is killed by a
+signal (CPU/memory limit) mid-frame, the worker dies with the same signal
+and the parent recycles it.
+"""
+import builtins
+import codecs
+import io
+import json
+import os
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+HEADER = struct.Struct(">I")
+# Output is sent to the parent in frames of at most this many characters, or
+# sooner once FLUSH_INTERVAL seconds have passed since the last frame.
+FRAME_CHARS = 16 * 1024
+FLUSH_INTERVAL = 0.05
+
+
+class OutputLimitExceeded(BaseException):
+    """Raised into the candidate's code; BaseException so `except Exception` cannot swallow it."""
+
+
+class _BufferWriter(io.RawIOBase):
+    """`.buffer` of a _StreamWriter, for code that writes bytes to sys.stdout.buffer."""
+
+    def __init__(self, text):
+        self.text = text
+        # Keeps a multi-byte character split across two writes intact
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = bytes(b)
+        self.text.write(self.decoder.decode(data))
+        return len(data)
+
+    def flush(self):
+        self.text.flush()
+
+
+class _StreamWriter(io.TextIOBase):
+    """sys.stdout/sys.stderr replacement that forwards output as frames."""
+
+    encoding = "utf-8"
+    errors = "strict"
+
+    def __init__(self, fd, name, counter, limit):
+        self.fd = fd
+        self.name = name
+        self.counter = counter
+        self.limit = limit
+        self.pending = []
+        self.pending_chars = 0
+        self.last_flush = time.monotonic()
+        self.buffer = _BufferWriter(self)
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        if not isinstance(s, str):
+            raise TypeError(f"write() argument must be str, not {type(s).__name__}")
+        self.counter[0] += len(s)
+        if self.counter[0] > self.limit:
+            raise OutputLimitExceeded()
+        self.pending.append(s)
+        self.pending_chars += len(s)
+        if self.pending_chars >= FRAME_CHARS or time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+        return len(s)
+
+    def flush(self):
+        if self.pending:
+            _write_frame(self.fd, {"stream": self.name, "data": "".join(self.pending)})
+            self.pending, self.pending_chars = [], 0
+        self.last_flush = time.monotonic()
+
+
+def _read_exact(fd, size):
+    data = b""
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def _write_frame(fd, payload, _len=len):
+    # len is bound at import: the candidate's code may replace builtins.len
+    data = json.dumps(payload).encode("utf-8")
+    data = HEADER.pack(_len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _limit_cpu(seconds):
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    # Soft limit only: SIGXCPU terminates the worker and the parent recycles it
+    resource.setrlimit(resource.RLIMIT_CPU, (used + seconds, resource.RLIM_INFINITY))
+
+
+def _report(write):
+    """Writes an error report; False if that hit the output limit."""
+    try:
+        write()
+        return True
+    except OutputLimitExceeded:
+        return False
+
+
+def _run(code, stdin, proto_out, output_limit):
+    counter = [0]
+    stdout = _StreamWriter(proto_out, "stdout", counter, output_limit)
+    stderr = _StreamWriter(proto_out, "stderr", counter, output_limit)
+    saved = sys.stdin, sys.stdout, sys.stderr
+    # Byte-backed like the real stdin, so sys.stdin.buffer.read() works too
+    sys.stdin = io.TextIOWrapper(io.BytesIO(stdin.encode("utf-8")), encoding="utf-8")
+    sys.stdout, sys.stderr = stdout, stderr
+    exit_code = 0
+    limit_exceeded = False
+    try:
+        compiled = compile(code, "main.py", "exec")
+        exec(compiled, {"__name__": "__main__", "__builtins__": builtins})
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            limit_exceeded = not _report(lambda: print(e.code, file=stderr))
+            exit_code = 1
+    except OutputLimitExceeded:
+        limit_exceeded = True
+        exit_code = 1
+    except BaseException:
+        etype, value, tb = sys.exc_info()
+        # Drop this frame so the traceback starts in the candidate's code
+        limit_exceeded = not _report(
+            lambda: traceback.print_exception(etype, value, tb.tb_next if tb.tb_next else tb, file=stderr)
+        )
+        exit_code = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+        for stream in (stdout, stderr):
+            stream.flush()
+    return exit_code, limit_exceeded
+
+
+def _run_forked(request, proto_in, proto_out):
+    """
+    Runs one request in a child process and returns its result frame. The
+    child reports over a private pipe; if it exits without reporting (e.g.
+    os._exit in the candidate's code), its exit status is the result.
+    """
+    # Inside the worker's own directory, which the parent removes on retire
+    workdir = tempfile.mkdtemp(prefix="run-", dir=os.getcwd())
+    result_r, result_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(result_r)
+            os.close(proto_in)
+            os.chdir(workdir)
+            _limit_cpu(request.get("cpu_seconds"))
+            exit_code, limit_exceeded = _run(request.get("code", ""), request.get("stdin", ""),
+                                             proto_out, request.get("output_limit", 8 * 1024 * 1024))
+            os.write(result_w, json.dumps({"code": exit_code, "limit_exceeded": limit_exceeded}).encode("utf-8"))
+            status = 0
+        finally:
+            # Never return into the worker loop from the child
+            os._exit(status)
+
+    os.close(result_w)
+    _, status = os.waitpid(pid, 0)
+    with os.fdopen(result_r, "rb") as f:
+        report = f.read()
+    shutil.rmtree(workdir, ignore_errors=True)
+    if os.WIFSIGNALED(status):
+        # A partial frame may be on the wire: die the same way so the parent
+        # sees the signal and replaces this worker
+        sig = os.WTERMSIG(status)
+        signal.signal(sig, signal.SIG_DFL)
+        os.kill(os.getpid(), sig)
+        os._exit(128 + sig)
+    if report:
+        return json.loads(report)
+    return {"code": os.WEXITSTATUS(status), "limit_exceeded": False}
+
+
+def main():
+    proto_in = os.dup(0)
+    proto_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    while True:
+        try:
+            (size,) = HEADER.unpack(_read_exact(proto_in, HEADER.size))
+            request = json.loads(_read_exact(proto_in, size))
+        except EOFError:
+            return
+        _write_frame(proto_out, _run_forked(request, proto_in, proto_out))
+
+
+if __name__ == "__main__":
+    main()
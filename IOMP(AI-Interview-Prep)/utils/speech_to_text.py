@@ -0,0 +1,404 @@
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+
+import numpy as np
+
+try:
+    import speech_recognition as sr
+except ImportError:
+    sr = None
+
+# "google" (Google Web Speech API) or, opt-in, "sphinx" (offline, pocketsphinx;
+# less accurate and CPU-heavy)
+STT_BACKEND = os.getenv("STT_BACKEND", "google")
+# Recordings transcribed in the background at the same time, process-wide
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", "2"))
+# Segments of one recording recognised at the same time
+SEGMENT_WORKERS = int(os.getenv("STT_SEGMENT_WORKERS", str(max(2, os.cpu_count() or 2))))
+
+# Voice activity detection works on 20ms frames. A frame is speech when its
+# RMS is VAD_NOISE_RATIO times the recording's noise floor (10th percentile),
+# or within 20 dB of its loud frames (95th percentile) for answers with
+# hardly any pauses, and always above VAD_MIN_RMS (16-bit scale).
+VAD_FRAME_SECONDS = 0.02
+VAD_NOISE_RATIO = 3.0
+VAD_PEAK_RATIO = 0.1
+VAD_MIN_RMS = 300.0
+# Pauses shorter than this do not split speech; shorter bursts are dropped
+MIN_SILENCE_SECONDS = 0.3
+MIN_SPEECH_SECONDS = 0.2
+# Speech runs are packed into segments of up to SEGMENT_TARGET_SECONDS, cut
+# only at pauses; a run longer than MAX_SEGMENT_SECONDS is cut at its
+# quietest frame. Each segment keeps SEGMENT_PAD_SECONDS of context.
+SEGMENT_TARGET_SECONDS = 8.0
+MAX_SEGMENT_SECONDS = 15.0
+SEGMENT_PAD_SECONDS = 0.15
+
+
+class SpeechToTextError(Exception):
+    """The backend could not transcribe at all (missing engine, no network)."""
+
+
+class STTBackend:
+    """A speech recogniser: `recognize(audio)` returns the text, "" for unintelligible audio."""
+
+    name = None
+    cpu_bound = False
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer() if sr else None
+
+    def available(self):
+        return sr is not None
+
+    def _recognize(self, audio):
+        raise NotImplementedError
+
+    def recognize(self, audio):
+        if not self.available():
+            raise SpeechToTextError(f"Speech backend '{self.name}' is not installed.")
+        try:
+            return self._recognize(audio)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise SpeechToTextError(f"Speech backend '{self.name}' failed: {e}") from e
+
+
+class GoogleBackend(STTBackend):
+    name = "google"
+
+    def _recognize(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+
+class SphinxBackend(STTBackend):
+    name = "sphinx"
+    # Decoding is CPU-bound, so segments go to worker processes
+    cpu_bound = True
+
+    def __init__(self):
+        super().__init__()
+        self._decoder = None
+
+    def available(self):
+        try:
+            import pocketsphinx  # noqa: F401
+        except ImportError:
+            return False
+        return super().available()
+
+    def _get_decoder(self):
+        """
+        Loads the en-US models shipped with SpeechRecognition once and keeps
+        the decoder (recognize_sphinx would load them again for every call).
+        """
+        if self._decoder is None:
+            from pocketsphinx import pocketsphinx
+            data = os.path.join(os.path.dirname(os.path.abspath(sr.__file__)), "pocketsphinx-data", "en-US")
+            if not os.path.isdir(data):
+                raise sr.RequestError(f"missing PocketSphinx language data directory: {data}")
+            config = pocketsphinx.Config()
+            config.set_string("-hmm", os.path.join(data, "acoustic-model"))
+            config.set_string("-lm", os.path.join(data, "language-model.lm.bin"))
+            config.set_string("-dict", os.path.join(data, "pronounciation-dictionary.dict"))
+            config.set_string("-logfn", os.devnull)
+            self._decoder = pocketsphinx.Decoder(config)
+        return self._decoder
+
+    def _recognize(self, audio):
+        decoder = self._get_decoder()
+        decoder.start_utt()
+        decoder.process_raw(audio.get_raw_data(convert_rate=16000, convert_width=2), False, True)
+        decoder.end_utt()
+        hypothesis = decoder.hyp()
+        if hypothesis is None:
+            raise sr.UnknownValueError()
+        return hypothesis.hypstr
+
+
+STT_BACKENDS = {"google": GoogleBackend, "sphinx": SphinxBackend}
+
+
+# One instance per backend name, so Sphinx's decoder is only ever loaded once
+# on the page process
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def _get_backend(name):
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = STT_BACKENDS[name]()
+        return _backends[name]
+
+
+def get_stt_backend(name=None):
+    """The configured backend, falling back to another one if it is not installed."""
+    name = name or STT_BACKEND
+    if name not in STT_BACKENDS:
+        print(f"Unknown speech backend '{name}', using google.")
+        name = "google"
+    backend = _get_backend(name)
+    if not backend.available():
+        for other in STT_BACKENDS:
+            fallback = _get_backend(other)
+            if other != name and fallback.available():
+                print(f"Speech backend '{name}' is not installed, using '{other}'.")
+                return fallback
+    return backend
+
+
+class Transcription:
+    """
+    Running result of one transcription. `segments` are in audio order with
+    start/end times in seconds; their text is filled in as they finish.
+    """
+
+    def __init__(self, backend, audio_seconds=0.0, segments=()):
+        self.backend = backend
+        self.audio_seconds = audio_seconds
+        self.segments = [{"start": start, "end": end, "text": None} for start, end in segments]
+        self.elapsed = 0.0
+        self.done = False
+
+    @property
+    def completed(self):
+        return sum(segment["text"] is not None for segment in self.segments)
+
+    @property
+    def text(self):
+        return " ".join(segment["text"] for segment in self.segments if segment["text"])
+
+    def timestamped(self):
+        return [f"[{int(s['start'] // 60)}:{int(s['start'] % 60):02d}] {s['text']}"
+                for s in self.segments if s["text"]]
+
+    @property
+    def rtf(self):
+        """Real-time factor: seconds of processing per second of audio (< 1 is faster than real time)."""
+        return self.elapsed / self.audio_seconds if self.audio_seconds else 0.0
+
+
+def read_pcm(audio_file):
+    """Decodes a WAV/AIFF/FLAC file to mono 16-bit samples and the sample rate."""
+    with sr.AudioFile(audio_file) as source:
+        audio = sr.Recognizer().record(source)
+    return np.frombuffer(audio.get_raw_data(convert_width=2), dtype=np.int16), audio.sample_rate
+
+
+def recognize_pcm(samples, rate, backend=None):
+    """Recognises a short clip in the calling thread with the configured backend. Raises SpeechToTextError."""
+    backend = backend or get_stt_backend()
+    return backend.recognize(sr.AudioData(samples.tobytes(), rate, 2))
+
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def detect_speech_segments(samples, rate):
+    """
+    Energy-based voice activity detection. Returns (start, end) sample ranges
+    to transcribe, each cut at a pause and at most MAX_SEGMENT_SECONDS long.
+    """
+    frame = max(1, int(rate * VAD_FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return []
+    frames = samples[:count * frame].astype(np.float32).reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    floor, loud = np.percentile(rms, [10, 95])
+    threshold = max(min(floor * VAD_NOISE_RATIO, loud * VAD_PEAK_RATIO), VAD_MIN_RMS)
+
+    def to_frames(seconds):
+        return max(1, int(round(seconds / VAD_FRAME_SECONDS)))
+
+    # Merge speech separated by short pauses, then drop clicks
+    runs = []
+    for start, end in _runs(rms > threshold):
+        if runs and start - runs[-1][1] < to_frames(MIN_SILENCE_SECONDS):
+            runs[-1] = (runs[-1][0], end)
+        else:
+            runs.append((start, end))
+    runs = [(start, end) for start, end in runs if end - start >= to_frames(MIN_SPEECH_SECONDS)]
+
+    # Split runs that are too long at their quietest frame in the back half
+    max_frames = to_frames(MAX_SEGMENT_SECONDS)
+    pieces = []
+    for start, end in runs:
+        while end - start > max_frames:
+            cut = start + max_frames // 2 + int(np.argmin(rms[start + max_frames // 2:start + max_frames]))
+            pieces.append((start, cut))
+            start = cut
+        pieces.append((start, end))
+
+    # Pack neighbouring pieces into segments of up to the target length
+    target_frames = to_frames(SEGMENT_TARGET_SECONDS)
+    segments = []
+    for start, end in pieces:
+        if segments and end - segments[-1][0] <= target_frames:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+
+    # Pad into the surrounding pauses, but never into the previous segment
+    pad = int(rate * SEGMENT_PAD_SECONDS)
+    ranges = []
+    for start, end in segments:
+        start = max(start * frame - pad, ranges[-1][1] if ranges else 0)
+        ranges.append((start, min(len(samples), end * frame + pad)))
+    return ranges
+
+
+# Backends built once per worker (process or thread) by _init_segment_worker
+_worker_state = threading.local()
+
+
+def _init_segment_worker():
+    """Pool initializer: a fresh worker has no backends yet."""
+    _worker_state.backends = {}
+
+
+def _recognize_segment(backend_name, raw, rate):
+    """Recognises one segment; module-level so worker processes can run it."""
+    backends = getattr(_worker_state, "backends", None)
+    if backends is None:
+        backends = _worker_state.backends = {}
+    if backend_name not in backends:
+        # Sphinx loads its models when first used, so each worker keeps one
+        # backend for all its segments
+        backends[backend_name] = STT_BACKENDS[backend_name]()
+    return backends[backend_name].recognize(sr.AudioData(raw, rate, 2))
+
+
+_segment_pools = {}
+_segment_pools_lock = threading.Lock()
+
+
+def get_segment_pool(cpu_bound):
+    """Processes for CPU-bound engines (they hold the GIL), threads for network ones."""
+    with _segment_pools_lock:
+        if cpu_bound not in _segment_pools:
+            if cpu_bound:
+                # spawn: forking the threaded Streamlit server is not safe
+                _segment_pools[cpu_bound] = ProcessPoolExecutor(
+                    max_workers=SEGMENT_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_segment_worker)
+            else:
+                _segment_pools[cpu_bound] = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS,
+                                                               thread_name_prefix="stt-segment",
+                                                               initializer=_init_segment_worker)
+        return _segment_pools[cpu_bound]
+
+
+def transcribe_segments(audio_file, backend=None):
+    """
+    Splits a recording at pauses and recognises the segments concurrently.
+    Yields the same Transcription each time a segment finishes (segments
+    complete out of order; `text` is always stitched in audio order). Raises
+    SpeechToTextError.
+    """
+    if sr is None:
+        raise SpeechToTextError("SpeechRecognition is not installed.")
+    backend = backend or get_stt_backend()
+    start = time.perf_counter()
+    try:
+        samples, rate = read_pcm(audio_file)
+    except Exception as e:
+        raise SpeechToTextError(f"Could not read the recording: {e}") from e
+    ranges = detect_speech_segments(samples, rate)
+    if not ranges and len(samples):
+        # Nothing passed the VAD (e.g. a very quiet microphone): let the
+        # recogniser decide on the whole clip rather than returning nothing
+        ranges = [(0, len(samples))]
+    result = Transcription(backend.name, len(samples) / rate, [(float(s / rate), float(e / rate)) for s, e in ranges])
+
+    if not backend.available():
+        raise SpeechToTextError(f"Speech backend '{backend.name}' is not installed.")
+    pool = get_segment_pool(backend.cpu_bound)
+    futures = {pool.submit(_recognize_segment, backend.name, samples[s:e].tobytes(), rate): i
+               for i, (s, e) in enumerate(ranges)}
+    try:
+        for future in as_completed(futures):
+            result.segments[futures[future]]["text"] = future.result()
+            result.elapsed = time.perf_counter() - start
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
+
+    result.elapsed = time.perf_counter() - start
+    result.done = True
+    longest = max((s["end"] - s["start"] for s in result.segments), default=0.0)
+    print(f"Transcribed {result.audio_seconds:.1f}s of audio ({len(ranges)} segments, longest {longest:.1f}s) "
+          f"with {result.backend} in {result.elapsed:.2f}s (RTF {result.rtf:.2f})")
+    yield result
+
+
+class TranscriptionJob:
+    """
+    One recording transcribed on the background pool. `result` is replaced by
+    the running Transcription after every chunk, so the page can show partial
+    text while it polls; the job never touches st.*.
+    """
+
+    def __init__(self, audio_bytes, backend=None):
+        self.audio_bytes = audio_bytes
+        self.backend = backend
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    @property
+    def text(self):
+        return self.result.text if self.result else ""
+
+    def wait(self, timeout=None):
+        try:
+            self.future.result(timeout)
+        except FutureTimeoutError:
+            return False
+        return True
+
+    def run(self):
+        try:
+            for result in transcribe_segments(io.BytesIO(self.audio_bytes), self.backend):
+                self.result = result
+        except SpeechToTextError as e:
+            self.error = str(e)
+        except Exception as e:
+            print(f"Transcription failed: {e}")
+            self.error = f"Could not transcribe the recording: {e}"
+        finally:
+            # The recording is only needed while transcribing
+            self.audio_bytes = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_transcription_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=TRANSCRIPTION_WORKERS, thread_name_prefix="stt")
+    return _pool
+
+
+def submit_transcription(audio_bytes, backend=None):
+    job = TranscriptionJob(audio_bytes, backend)
+    job.future = get_transcription_pool().submit(job.run)
+    return job
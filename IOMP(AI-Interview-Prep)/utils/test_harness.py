@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import local_runner
+from utils.exec_scheduler import EXEC_WORKERS, get_exec_scheduler
+from utils.piston_api import execute_code, precheck_code
+from utils.sandbox import (
+    CPU_LIMIT_SECONDS, SANDBOX_SUPPORTED, describe_signal, kill_process_group, rlimit_preexec
+)
+
+HARNESS_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "harness_worker.py")
+CASE_TIMEOUT_SECONDS = 5
+MAX_CASE_OUTPUT = 64 * 1024
+# Upper bound; a run only gets as many batches as the scheduler has idle slots
+MAX_BATCHES = EXEC_WORKERS
+
+_batch_executor = ThreadPoolExecutor(max_workers=MAX_BATCHES, thread_name_prefix="test-batch")
+
+
+def outputs_match(actual, expected):
+    """Whitespace-insensitive comparison, the usual judge behaviour."""
+    return actual.split() == (expected or "").split()
+
+
+def _split_batches(cases, n):
+    n = max(1, min(n, len(cases)))
+    return [cases[i::n] for i in range(n)]
+
+
+def _run_python_batch(code, batch):
+    """Runs a batch of cases in one warm interpreter that forks per case."""
+    request = json.dumps({
+        "code": code,
+        "cases": [{"index": c["index"], "input": c.get("input", "")} for c in batch],
+        "timeout": CASE_TIMEOUT_SECONDS,
+        "cpu_seconds": CPU_LIMIT_SECONDS,
+        "max_output": MAX_CASE_OUTPUT,
+    })
+    workdir = tempfile.mkdtemp(prefix="harness-")
+    proc = subprocess.Popen(
+        [sys.executable, "-I", HARNESS_WORKER],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        cwd=workdir, preexec_fn=rlimit_preexec(cpu_seconds=None),
+    )
+    try:
+        stdout, _ = proc.communicate(request.encode("utf-8"), timeout=(CASE_TIMEOUT_SECONDS + 2) * len(batch))
+        return json.loads(stdout)
+    except (subprocess.TimeoutExpired, ValueError):
+        kill_process_group(proc)
+        proc.communicate()
+        return [{"index": c["index"], "stdout": "", "stderr": "", "code": -1,
+                 "error": "Test batch did not finish", "wall_time": None, "peak_rss_kb": None} for c in batch]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_measured(cmd, stdin, cwd, memory_mb):
+    """
+    Runs one case of a compiled program and reaps it with wait4() so that its
+    own peak RSS is available, which subprocess.run() does not expose.
+    """
+    with tempfile.TemporaryFile() as fin, tempfile.TemporaryFile() as fout, tempfile.TemporaryFile() as ferr:
+        fin.write(stdin.encode("utf-8"))
+        fin.seek(0)
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdin=fin, stdout=fout, stderr=ferr, cwd=cwd,
+                                preexec_fn=rlimit_preexec(memory_mb=memory_mb))
+        deadline = start + CASE_TIMEOUT_SECONDS
+        delay = 0.0005
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                kill_process_group(proc)
+                pid, status, rusage = os.wait4(proc.pid, 0)
+                proc.returncode = -9
+                return {"stdout": "", "stderr": "", "code": -9,
+                        "error": f"Timed out ({CASE_TIMEOUT_SECONDS}s limit)",
+                        "wall_time": time.perf_counter() - start, "peak_rss_kb": rusage.ru_maxrss}
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+        wall_time = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        fout.seek(0)
+        ferr.seek(0)
+        stdout = fout.read(MAX_CASE_OUTPUT).decode("utf-8", errors="replace")
+        stderr = ferr.read(MAX_CASE_OUTPUT).decode("utf-8", errors="replace")
+    if proc.returncode < 0:
+        stderr += describe_signal(-proc.returncode)
+    return {"stdout": stdout, "stderr": stderr, "code": proc.returncode,
+            "wall_time": wall_time, "peak_rss_kb": rusage.ru_maxrss}
+
+
+def _run_compiled_batch(language, code, artifact_dir, batch):
+    cmd = local_runner.run_command(language, code, artifact_dir)
+    memory_mb = local_runner.TOOLCHAINS[language]["memory_mb"]
+    results = []
+    workdir = tempfile.mkdtemp(prefix="harness-")
+    try:
+        for case in batch:
+            result = _run_measured(cmd, case.get("input", ""), workdir, memory_mb)
+            result["index"] = case["index"]
+            results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _run_unmeasured_batch(language, code, batch):
+    """Fallback without rlimits/wait4 (e.g. Windows): plain sandboxed runs."""
+    results = []
+    for case in batch:
+        start = time.perf_counter()
+        result = execute_code(language, code, case.get("input", ""))
+        result = {"stdout": result.get("stdout", ""), "stderr": result.get("stderr", ""),
+                  "code": result.get("code", -1), "error": result.get("error"),
+                  "wall_time": time.perf_counter() - start, "peak_rss_kb": None}
+        result["index"] = case["index"]
+        results.append(result)
+    return results
+
+
+def _run_batches(language, code, batches):
+    """Runs the batches in parallel; returns {case index: result} or {"error": ...}."""
+    if not SANDBOX_SUPPORTED:
+        futures = [_batch_executor.submit(_run_unmeasured_batch, language, code, b) for b in batches]
+    elif language == "python":
+        futures = [_batch_executor.submit(_run_python_batch, code, b) for b in batches]
+    elif language in local_runner.TOOLCHAINS and local_runner.is_available(language):
+        artifact_dir, compile_error = local_runner.build(language, code)
+        if compile_error:
+            return {"error": "Compilation failed.\n" + compile_error.get("stderr", compile_error.get("error", ""))}
+        futures = [_batch_executor.submit(_run_compiled_batch, language, code, artifact_dir, b) for b in batches]
+    else:
+        futures = [_batch_executor.submit(_run_unmeasured_batch, language, code, b) for b in batches]
+
+    by_index = {}
+    for future in futures:
+        for result in future.result():
+            by_index[result["index"]] = result
+    return by_index
+
+
+def run_test_cases(language, code, test_cases):
+    """
+    Runs `code` against every {"input", "expected_output"} test case. Cases
+    are split into batches that run in parallel, one process per batch, and
+    each case reports pass/fail, wall time and peak RSS. Runs as an execution
+    scheduler job: it has one slot of its own and only fans out over slots
+    the scheduler has idle.
+    """
+    cases = [dict(c, index=i) for i, c in enumerate(test_cases)]
+    if not cases:
+        return {"error": "This question has no test cases."}
+    rejected = precheck_code(language, code)
+    if rejected is not None:
+        return {"error": rejected["stderr"]}
+
+    scheduler = get_exec_scheduler()
+    extra = scheduler.borrow_slots(min(MAX_BATCHES, len(cases)) - 1)
+    try:
+        by_index = _run_batches(language, code, _split_batches(cases, 1 + extra))
+    finally:
+        scheduler.return_slots(extra)
+    if "error" in by_index:
+        return by_index
+
+    results = []
+    for case in cases:
+        result = by_index[case["index"]]
+        result["input"] = case.get("input", "")
+        result["expected_output"] = case.get("expected_output", "")
+        result["passed"] = (not result.get("error") and result.get("code") == 0
+                            and outputs_match(result.get("stdout", ""), case.get("expected_output")))
+        results.append(result)
+
+    wall_times = [r["wall_time"] for r in results if r.get("wall_time") is not None]
+    rss = [r["peak_rss_kb"] for r in results if r.get("peak_rss_kb")]
+    return {
+        "results": results,
+        "passed": sum(r["passed"] for r in results),
+        "total": len(results),
+        "max_wall_time": max(wall_times) if wall_times else None,
+        "max_peak_rss_kb": max(rss) if rss else None,
+    }
+
+
+def summarize_test_results(report):
+    """Compact, factual summary of a run_test_cases report for the grader."""
+    if not report or "error" in report:
+        return (report or {}).get("error", "Tests were not run.")
+    lines = [f"{report['passed']}/{report['total']} test cases passed."]
+    if report.get("max_wall_time") is not None:
+        lines.append(f"Slowest case: {report['max_wall_time'] * 1000:.1f} ms wall time.")
+    if report.get("max_peak_rss_kb"):
+        lines.append(f"Peak memory: {report['max_peak_rss_kb'] / 1024:.1f} MiB RSS.")
+    for r in report["results"]:
+        if not r["passed"]:
+            reason = r.get("error") or ("exit code %s" % r["code"] if r.get("code") else "wrong answer")
+            lines.append(f"Case {r['index'] + 1} failed ({reason}): input {r['input'][:80]!r}, "
+                         f"expected {r['expected_output'][:80]!r}, got {r.get('stdout', '')[:80]!r}.")
+    return "\n".join(lines)